@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="VersionTabla",
+            fields=[
+                (
+                    "tabla",
+                    models.CharField(
+                        help_text="Etiqueta del modelo (app.Modelo)",
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+                ("updated_on", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "Versión de tabla",
+                "verbose_name_plural": "Versiones de tabla",
+            },
+        ),
+    ]
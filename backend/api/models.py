@@ -1,3 +1,70 @@
-from django.db import models
+from functools import partial
 
-# Create your models here.
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class VersionTabla(models.Model):
+    """
+    Contador de versión de un modelo (por su etiqueta, p. ej. inventario.Libro)
+    que aumenta cada vez que se confirma una transacción que lo modifica.
+    Permite saber si un listado ha cambiado sin volver a consultarlo
+    """
+    tabla = models.CharField(
+        max_length=100,
+        primary_key=True,
+        help_text="Etiqueta del modelo (app.Modelo)"
+    )
+    version = models.BigIntegerField(default=0)
+    updated_on = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Versión de tabla"
+        verbose_name_plural = "Versiones de tabla"
+
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
+
+    @classmethod
+    def incrementar(cls, tabla):
+        """
+        Aumenta la versión de la tabla con un UPDATE atómico, creando la fila si no existe
+        """
+        valores = {'version': F('version') + 1, 'updated_on': timezone.now()}
+        if not cls.objects.filter(pk=tabla).update(**valores):
+            cls.objects.bulk_create([cls(tabla=tabla)], ignore_conflicts=True)
+            cls.objects.filter(pk=tabla).update(**valores)
+
+    @classmethod
+    def incrementar_al_confirmar(cls, modelo):
+        """
+        Programa el incremento de la versión del modelo para cuando se confirme
+        la transacción en curso (o en el acto si no hay ninguna). Fuera de la
+        transacción la fila del contador no queda bloqueada y nunca se publica
+        una versión nueva con los datos antiguos. Cada tabla se incrementa una
+        sola vez por transacción
+        """
+        tabla = modelo._meta.label
+        conexion = transaction.get_connection()
+        programada = partial(cls.incrementar, tabla)
+        if conexion.in_atomic_block and any(
+            getattr(funcion, 'func', None) == programada.func and funcion.args == programada.args
+            for _, funcion, _ in conexion.run_on_commit
+        ):
+            return
+        transaction.on_commit(programada)
+
+    @classmethod
+    def versiones(cls, modelos):
+        """
+        Devuelve {etiqueta: (version, updated_on)} de los modelos con una sola consulta
+        """
+        tablas = [modelo._meta.label for modelo in modelos]
+        guardadas = {
+            tabla: (version, updated_on)
+            for tabla, version, updated_on in cls.objects.filter(pk__in=tablas).values_list(
+                'tabla', 'version', 'updated_on'
+            )
+        }
+        return {tabla: guardadas.get(tabla, (0, None)) for tabla in tablas}
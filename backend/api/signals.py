@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from backend.versiones import tabla_modificada
+from facturacion.models import Factura, LineaFactura
+from inventario.models import Libro
+
+from .models import VersionTabla
+
+# Modelos cuya versión de tabla valida los ETag de los listados de la API
+MODELOS_VERSIONADOS = [Libro, Factura, LineaFactura]
+
+
+@receiver(tabla_modificada)
+def incrementar_version(sender, **kwargs):
+    """
+    Invalida los ETag de los listados del modelo al confirmar la transacción
+    """
+    VersionTabla.incrementar_al_confirmar(sender)
+
+
+for modelo in MODELOS_VERSIONADOS:
+    post_save.connect(incrementar_version, sender=modelo, dispatch_uid=f'version_{modelo._meta.label}_save')
+    post_delete.connect(incrementar_version, sender=modelo, dispatch_uid=f'version_{modelo._meta.label}_delete')
@@ -1,3 +1,39 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from inventario.models import Libro
+
+
+class PeticionCondicionalTests(TestCase):
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_X_API_KEY=settings.API_KEY)
+
+    def test_detalle_con_clave_no_valida_responde_404(self):
+        for url in ['/api/v1/facturacion/facturas/abc/', '/api/v1/inventario/libros/abc/']:
+            with self.subTest(url=url):
+                self.assertEqual(self.cliente.get(url).status_code, 404)
+
+
+class CacheListadoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Libro.objects.bulk_create(
+            Libro(titulo=f'Libro {numero}', precio=Decimal('10.00'), cantidad=1)
+            for numero in range(3)
+        )
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_X_API_KEY=settings.API_KEY)
+
+    def test_cursor_vacio_no_usa_la_pagina_cacheada(self):
+        url = '/api/v1/inventario/libros/'
+        self.assertIn('count', self.cliente.get(url).json())
 
-# Create your tests here.
+        respuesta = self.cliente.get(url + '?cursor=').json()
+        self.assertNotIn('count', respuesta)
+        self.assertEqual(len(respuesta['results']), 3)
@@ -0,0 +1,76 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .pagination import Paginacion
+
+# Parámetros que no cambian los datos del listado
+PARAMETROS_IGNORADOS = {'format'}
+
+# Parámetros que cuentan aunque estén vacíos: ?cursor= activa la paginación por clave
+PARAMETROS_PRESENCIA = {Paginacion.cursor_query_param}
+
+CONTADORES = ('aciertos', 'fallos')
+
+
+def cache_api():
+    return caches['api']
+
+
+def clave_listado(request, versiones):
+    """
+    Clave de la página pedida: ruta, parámetros normalizados (ordenados y sin
+    vacíos) y versión de las tablas de las que dependen los datos. Al cambiar
+    una tabla su versión aumenta y las claves antiguas dejan de usarse; la
+    caché las expulsa después como las menos usadas
+    """
+    parametros = sorted(
+        (nombre, valor)
+        for nombre, valores in request.query_params.lists()
+        if nombre not in PARAMETROS_IGNORADOS
+        for valor in valores
+        if valor != '' or nombre in PARAMETROS_PRESENCIA
+    )
+    # Los enlaces de paginación son absolutos, así que dependen del host
+    contenido = repr((request.build_absolute_uri(request.path), parametros, sorted(versiones.items())))
+    return 'listado:' + hashlib.md5(contenido.encode(), usedforsecurity=False).hexdigest()
+
+
+def contar(contador):
+    cache = cache_api()
+    clave = f'estadisticas:{contador}'
+    cache.add(clave, 0, timeout=None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La entrada se ha expulsado entre add e incr
+        cache.set(clave, 1, timeout=None)
+
+
+def estadisticas():
+    """
+    Aciertos y fallos de la caché de listados. Con la caché en memoria local
+    son los del proceso que responde
+    """
+    valores = cache_api().get_many([f'estadisticas:{contador}' for contador in CONTADORES])
+    datos = {contador: valores.get(f'estadisticas:{contador}', 0) for contador in CONTADORES}
+    consultas = datos['aciertos'] + datos['fallos']
+    datos['ratio_aciertos'] = round(datos['aciertos'] / consultas, 4) if consultas else None
+    datos['backend'] = settings.CACHES['api']['BACKEND']
+    return datos
+
+
+class EstadisticasCacheView(APIView):
+    """
+    GET: aciertos y fallos de la caché de listados. DELETE: pone los contadores a cero
+    """
+
+    def get(self, request):
+        return Response(estadisticas())
+
+    def delete(self, request):
+        cache_api().delete_many([f'estadisticas:{contador}' for contador in CONTADORES])
+        return Response(estadisticas())
@@ -0,0 +1,115 @@
+import hashlib
+from calendar import timegm
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from api.models import VersionTabla
+
+from .cache import cache_api, clave_listado, contar
+
+
+class PeticionCondicionalMixin:
+    """
+    Añade ETag y Last-Modified a las respuestas de list y retrieve y responde
+    304 Not Modified a If-None-Match / If-Modified-Since. La marca se calcula
+    con una consulta pequeña antes de leer y serializar los datos, así que
+    volver a pedir algo que no ha cambiado apenas cuesta nada.
+
+    - Detalle: el mayor updated_on del objeto y de los objetos que incluye su
+      representación, indicados en `campos_ultima_modificacion`.
+    - Listado: la versión de las tablas de `modelos_version` (por defecto la
+      del modelo de la vista), que aumenta con cada escritura confirmada (ver
+      api.models.VersionTabla).
+
+    Con `cachear_listado` los datos de cada página del listado se guardan en la
+    caché 'api' con una clave que incluye esas versiones (ver api/v1/cache.py),
+    así que cualquier cambio en las tablas invalida las páginas afectadas.
+    """
+    campos_ultima_modificacion = ['updated_on']
+    modelos_version = None
+    cachear_listado = False
+
+    def get_modelos_version(self):
+        return self.modelos_version or [self.queryset.model]
+
+    def list(self, request, *args, **kwargs):
+        versiones = VersionTabla.versiones(self.get_modelos_version())
+        fechas = [fecha for _, fecha in versiones.values() if fecha]
+        marca = [f'{tabla}:{version}' for tabla, (version, _) in sorted(versiones.items())]
+        vista = super().list
+        if self.cachear_listado:
+            vista = partial(self.listado_cacheado, vista, versiones)
+        return self.respuesta_condicional(
+            marca, max(fechas, default=None), vista, request, *args, **kwargs
+        )
+
+    def listado_cacheado(self, vista, versiones, request, *args, **kwargs):
+        """
+        Devuelve los datos de la página guardados en la caché o, si no están,
+        los genera con la vista y los guarda. Indica el resultado en X-Cache
+        """
+        clave = clave_listado(request, versiones)
+        datos = cache_api().get(clave)
+        if datos is not None:
+            contar('aciertos')
+            response = Response(datos)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        contar('fallos')
+        response = vista(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache_api().set(clave, response.data)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            fechas = (
+                self.filter_queryset(self.get_queryset())
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .aggregate(**{
+                    f'fecha_{indice}': Max(campo)
+                    for indice, campo in enumerate(self.campos_ultima_modificacion)
+                })
+            )
+        except (TypeError, ValueError, ValidationError):
+            # Clave con formato no válido: que retrieve responda el 404 de siempre
+            return super().retrieve(request, *args, **kwargs)
+        fechas = [fecha for fecha in fechas.values() if fecha]
+        if not fechas:
+            # No existe: que retrieve responda el 404 de siempre
+            return super().retrieve(request, *args, **kwargs)
+
+        marca = [kwargs[lookup_url_kwarg], *(fecha.isoformat() for fecha in fechas)]
+        return self.respuesta_condicional(
+            marca, max(fechas), super().retrieve, request, *args, **kwargs
+        )
+
+    def respuesta_condicional(self, marca, ultima_modificacion, vista, request, *args, **kwargs):
+        """
+        Responde 304 si el cliente ya tiene la versión indicada por `marca`;
+        si no, ejecuta la vista. En ambos casos añade ETag y Last-Modified
+        """
+        # La URL (filtros, página) y el formato también forman parte de la representación
+        contenido = '|'.join([request.get_full_path(), request.accepted_media_type, *map(str, marca)])
+        etag = '"%s"' % hashlib.md5(contenido.encode(), usedforsecurity=False).hexdigest()
+        marca_tiempo = timegm(ultima_modificacion.utctimetuple()) if ultima_modificacion else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=marca_tiempo)
+        if response is None:
+            response = vista(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            if marca_tiempo:
+                response.headers['Last-Modified'] = http_date(marca_tiempo)
+            # Permitir guardar la respuesta pero revalidarla siempre
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
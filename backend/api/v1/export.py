@@ -0,0 +1,63 @@
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from backend.streaming import csv_streaming, xlsx_streaming
+
+
+class RendererExportacion(BaseRenderer):
+    """
+    Renderers que solo sirven para la negociación de contenido de la exportación
+    (?format= o sufijo .csv/.xlsx). Los datos se envían en streaming desde la
+    vista; aquí solo se renderizan las respuestas de error, como JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class RendererCSV(RendererExportacion):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class RendererXLSX(RendererExportacion):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+
+
+class ExportacionMixin:
+    """
+    Añade al ViewSet la acción GET export.csv / export.xlsx, que descarga los
+    resultados filtrados con filterset_class. Las filas se leen por bloques con
+    un cursor en el servidor (.iterator) y se escriben en streaming, así que la
+    memoria usada no depende del número de filas.
+
+    Las columnas se definen en `columnas_exportacion` como (cabecera, campo).
+    """
+    columnas_exportacion = []
+    nombre_exportacion = 'export'
+    lote_exportacion = 2000
+
+    @action(detail=False, methods=['get'], renderer_classes=[RendererCSV, RendererXLSX])
+    def export(self, request, *args, **kwargs):
+        """
+        Exporta los resultados filtrados en CSV o XLSX
+        """
+        cabeceras = [cabecera for cabecera, _ in self.columnas_exportacion]
+        campos = [campo for _, campo in self.columnas_exportacion]
+        queryset = self.filter_queryset(self.get_queryset())
+        filas = queryset.values_list(*campos).iterator(chunk_size=self.lote_exportacion)
+
+        formato = request.accepted_renderer.format
+        if formato == 'xlsx':
+            contenido = xlsx_streaming(cabeceras, filas, hoja=self.nombre_exportacion.capitalize())
+            content_type = RendererXLSX.media_type
+        else:
+            contenido = csv_streaming(cabeceras, filas)
+            content_type = f'{RendererCSV.media_type}; charset=utf-8'
+
+        response = StreamingHttpResponse(contenido, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.nombre_exportacion}.{formato}"'
+        return response
@@ -2,6 +2,7 @@ import django_filters
 from facturacion.models import Factura
 
 class FacturaFilter(django_filters.FilterSet):
+    q = django_filters.CharFilter(method='filtrar_busqueda')
     numero = django_filters.CharFilter(lookup_expr='icontains')
     cliente = django_filters.CharFilter(lookup_expr='icontains')
     nombre = django_filters.CharFilter(lookup_expr='icontains')
@@ -13,4 +14,10 @@ class FacturaFilter(django_filters.FilterSet):
 
     class Meta:
         model = Factura
-        fields = ['numero', 'cliente', 'nombre', 'estado', 'fecha', 'fecha_pago', 'total'] 
\ No newline at end of file
+        fields = ['numero', 'cliente', 'nombre', 'estado', 'fecha', 'fecha_pago', 'total']
+
+    def filtrar_busqueda(self, queryset, name, value):
+        """
+        Búsqueda por número, cliente o nombre ordenada por relevancia (?q=)
+        """
+        return queryset.buscar(value) 
\ No newline at end of file
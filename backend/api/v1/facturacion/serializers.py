@@ -1,3 +1,5 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
 from facturacion.models import Factura, LineaFactura
 from inventario.models import Libro
@@ -35,8 +37,26 @@ class FacturaSerializer(serializers.ModelSerializer):
         model = Factura
         fields = '__all__'
 
+class FacturaListSerializer(serializers.ModelSerializer):
+    """
+    Versión ligera de FacturaSerializer para el listado, sin las líneas
+    """
+    class Meta:
+        model = Factura
+        fields = '__all__'
+
+class LineaFacturaLoteSerializer(LineaFacturaCreateSerializer):
+    """
+    Línea anidada en FacturaCreateSerializer. El libro se recibe como id y su
+    existencia se comprueba para todas las líneas a la vez en validate_lineas
+    """
+    libro = serializers.IntegerField(source='libro_id')
+
+    class Meta(LineaFacturaCreateSerializer.Meta):
+        fields = ['libro', 'cantidad', 'precio', 'descuento', 'importe']
+
 class FacturaCreateSerializer(serializers.ModelSerializer):
-    lineas = LineaFacturaCreateSerializer(many=True, required=False)
+    lineas = LineaFacturaLoteSerializer(many=True, required=False)
 
     class Meta:
         model = Factura
@@ -46,16 +66,41 @@ class FacturaCreateSerializer(serializers.ModelSerializer):
             'gastos_envio', 'total', 'notas', 'estado', 'lineas'
         ]
 
+    def validate_lineas(self, lineas):
+        """
+        Comprueba que existen los libros de todas las líneas con una única consulta
+        """
+        ids = {linea['libro_id'] for linea in lineas}
+        existentes = set(Libro.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        no_encontrados = sorted(ids - existentes)
+        if no_encontrados:
+            raise serializers.ValidationError(
+                f"No existen los libros con id: {', '.join(map(str, no_encontrados))}"
+            )
+        return lineas
+
+    @transaction.atomic
     def create(self, validated_data):
         lineas_data = validated_data.pop('lineas', [])
         factura = Factura.objects.create(**validated_data)
         
-        # Crear las líneas de factura
-        for linea_data in lineas_data:
-            LineaFactura.objects.create(factura=factura, **linea_data)
+        # Crear todas las líneas de factura en bloque
+        try:
+            factura.crear_lineas([LineaFactura(**linea_data) for linea_data in lineas_data])
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'lineas': e.messages})
         
+        # Con las líneas y los totales ya guardados
+        factura.avisar_cambio_estado(None)
         return factura
 
+class EmitirLoteSerializer(serializers.Serializer):
+    """
+    Cuerpo de emitir-lote: ids de las facturas a emitir. Si no se indican se
+    emiten los borradores que cumplan los filtros de la URL
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, required=False)
+
 class EmpresaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Empresa
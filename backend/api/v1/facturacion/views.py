@@ -1,28 +1,94 @@
-from rest_framework import viewsets, status
+from rest_framework import serializers, viewsets, status
 from django_filters.rest_framework import DjangoFilterBackend
 from facturacion.models import Factura, LineaFactura, Empresa
-from .serializers import FacturaSerializer, FacturaCreateSerializer, LineaFacturaSerializer, LineaFacturaCreateSerializer, LineaFacturaUpdateSerializer, EmpresaSerializer, EmpresaUpdateSerializer
+from inventario.models import Libro
+from .serializers import FacturaSerializer, FacturaListSerializer, FacturaCreateSerializer, EmitirLoteSerializer, LineaFacturaSerializer, LineaFacturaCreateSerializer, LineaFacturaUpdateSerializer, EmpresaSerializer, EmpresaUpdateSerializer
 from .filters import FacturaFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse
-from facturacion.views import FacturaPDFView
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
+from facturacion.pdf import DocumentoFactura, zip_pdfs
+from ..conditional import PeticionCondicionalMixin
+from ..export import ExportacionMixin
 
-class FacturaViewSet(viewsets.ModelViewSet):
-    queryset = Factura.objects.all().order_by('-fecha')
+class FacturaViewSet(PeticionCondicionalMixin, ExportacionMixin, viewsets.ModelViewSet):
+    queryset = Factura.objects.all().order_by('-fecha', '-id')
     filterset_class = FacturaFilter
     filter_backends = [DjangoFilterBackend]
+    orden_keyset = ['-fecha', '-id']
+    cachear_listado = True
+    nombre_exportacion = 'facturas'
+    columnas_exportacion = [
+        ('ID', 'id'),
+        ('Número', 'numero'),
+        ('Número borrador', 'numero_borrador'),
+        ('Fecha', 'fecha'),
+        ('Estado', 'estado'),
+        ('Cliente', 'cliente'),
+        ('Nombre', 'nombre'),
+        ('NIF', 'nif'),
+        ('Domicilio', 'domicilio'),
+        ('CP y ciudad', 'cp_ciudad'),
+        ('Teléfono', 'telefono'),
+        ('Descuento', 'descuento'),
+        ('Base imponible', 'base_iva'),
+        ('IVA', 'iva'),
+        ('Recargo de equivalencia', 'recargo_equivalencia'),
+        ('Gastos de envío', 'gastos_envio'),
+        ('Total', 'total'),
+        ('Fecha de pago', 'fecha_pago'),
+    ]
+
+    # El detalle incluye las líneas y sus libros
+    campos_ultima_modificacion = ['updated_on', 'lineas__updated_on', 'lineas__libro__updated_on']
+
+    # Acciones que responden con FacturaSerializer, que incluye las líneas
+    acciones_con_lineas = ['list', 'retrieve', 'update', 'partial_update', 'emitir', 'anular']
+
+    def expandir_lineas(self):
+        """
+        El listado solo incluye las líneas si se piden con ?expand=lineas
+        """
+        if self.action != 'list':
+            return True
+        return 'lineas' in self.request.query_params.get('expand', '').split(',')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.acciones_con_lineas and self.expandir_lineas():
+            # Cargar líneas y libros con una consulta cada uno en lugar de una por factura
+            queryset = queryset.prefetch_related(
+                Prefetch('lineas', queryset=LineaFactura.objects.select_related('libro'))
+            )
+        return queryset
+
+    def get_modelos_version(self):
+        if self.expandir_lineas():
+            return [Factura, LineaFactura, Libro]
+        return [Factura]
 
     def get_serializer_class(self):
         if self.action == 'create':
             return FacturaCreateSerializer
+        if self.action == 'list' and not self.expandir_lineas():
+            return FacturaListSerializer
         return FacturaSerializer
 
+    def perform_update(self, serializer):
+        """
+        Devuelve un 400 si se modifican datos de una factura ya emitida
+        """
+        try:
+            serializer.save()
+        except ValidationError as e:
+            raise serializers.ValidationError(e.message_dict if hasattr(e, 'error_dict') else e.messages)
+
     @action(detail=True, methods=['get'])
     def lineas(self, request, pk=None):
         factura = self.get_object()
-        lineas = factura.lineas.all()
+        lineas = factura.lineas.select_related('libro')
         serializer = LineaFacturaSerializer(lineas, many=True)
         return Response(serializer.data)
 
@@ -58,6 +124,64 @@ class FacturaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='emitir-lote')
+    def emitir_lote(self, request):
+        """
+        Emite en bloque varias facturas en borrador. Recibe una lista de ids en 'ids'
+        o, si no se indica, emite los borradores que cumplan los filtros de la URL
+        """
+        serializer = EmitirLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get('ids')
+        
+        if ids is not None:
+            queryset = Factura.objects.filter(pk__in=ids)
+        elif request.query_params:
+            queryset = self.filter_queryset(self.get_queryset())
+        else:
+            return Response(
+                {'error': 'Indique los ids de las facturas o algún filtro'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            emitidas = queryset.emitir()
+        except ValidationError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': 'Error interno del servidor'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        resultados = [
+            {'id': factura.id, 'numero': factura.numero, 'estado': factura.estado}
+            for factura in emitidas
+        ]
+        
+        # Informar de las facturas solicitadas que no se han podido emitir
+        if ids is not None:
+            emitidas_ids = {factura.id for factura in emitidas}
+            estados = dict(
+                Factura.objects.filter(pk__in=ids).exclude(pk__in=emitidas_ids).values_list('id', 'estado')
+            )
+            for factura_id in ids:
+                if factura_id in emitidas_ids:
+                    continue
+                if factura_id in estados:
+                    error = 'Solo se pueden emitir facturas en estado borrador'
+                else:
+                    error = 'La factura no existe'
+                resultados.append({'id': factura_id, 'error': error})
+        
+        return Response(
+            {'emitidas': len(emitidas), 'resultados': resultados},
+            status=status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=['post'])
     def anular(self, request, pk=None):
         """
@@ -99,20 +223,38 @@ class FacturaViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
         """
-        Genera y descarga el PDF de una factura usando django-weasyprint
+        Genera y descarga el PDF de una factura usando WeasyPrint
         """
+        documento = DocumentoFactura.desde_peticion(request, pk, queryset=self.get_queryset())
+        
         try:
-            factura = self.get_object()
-            view = FacturaPDFView.as_view()
-            return view(request, pk=factura.id)
+            return documento.respuesta(request)
         except Exception as e:
             return Response(
                 {'error': f'Error generando PDF: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class LineaFacturaViewSet(viewsets.ModelViewSet):
-    queryset = LineaFactura.objects.all().order_by('libro__titulo')
+    @action(detail=False, methods=['get'], url_path='pdf-zip')
+    def pdf_zip(self, request):
+        """
+        Descarga en un ZIP los PDFs de las facturas que cumplan los filtros de la URL.
+        Los PDFs se renderizan en paralelo y el ZIP se envía en streaming
+        """
+        facturas = self.filter_queryset(self.get_queryset())
+        mostrar_iban = request.query_params.get('mostrar_iban', 'false').lower() == 'true'
+        
+        response = StreamingHttpResponse(
+            zip_pdfs(facturas, mostrar_iban),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="facturas.zip"'
+        return response
+
+class LineaFacturaViewSet(PeticionCondicionalMixin, viewsets.ModelViewSet):
+    queryset = LineaFactura.objects.select_related('libro').order_by('libro__titulo')
+    modelos_version = [LineaFactura, Libro]
+    campos_ultima_modificacion = ['updated_on', 'libro__updated_on']
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -122,6 +264,31 @@ class LineaFacturaViewSet(viewsets.ModelViewSet):
                 return LineaFacturaUpdateSerializer
         return LineaFacturaSerializer
 
+    def perform_create(self, serializer):
+        self.guardar_linea(serializer)
+
+    def perform_update(self, serializer):
+        self.guardar_linea(serializer)
+
+    def perform_destroy(self, instance):
+        """
+        Devuelve un 400 si la factura de la línea no es un borrador
+        """
+        try:
+            instance.delete()
+        except ValidationError as e:
+            raise serializers.ValidationError(e.message_dict if hasattr(e, 'error_dict') else e.messages)
+
+    def guardar_linea(self, serializer):
+        """
+        Devuelve un 400 si la factura no es un borrador o no hay stock suficiente
+        para la línea
+        """
+        try:
+            serializer.save()
+        except ValidationError as e:
+            raise serializers.ValidationError(e.message_dict if hasattr(e, 'error_dict') else {'cantidad': e.messages})
+
 class EmpresaViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar la configuración de la empresa.
@@ -138,7 +305,7 @@ class EmpresaViewSet(viewsets.ModelViewSet):
         """
         Obtiene la empresa. Si no existe, retorna 404.
         """
-        empresa = Empresa.objects.first()
+        empresa = Empresa.actual()
         if not empresa:
             return Response(
                 {'error': 'No se ha configurado ninguna empresa'},
@@ -152,7 +319,7 @@ class EmpresaViewSet(viewsets.ModelViewSet):
         """
         Crea la empresa. Solo permite crear una.
         """
-        if Empresa.objects.exists():
+        if Empresa.actual():
             return Response(
                 {'error': 'Ya existe una empresa configurada. Use PUT/PATCH para actualizarla.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -164,7 +331,7 @@ class EmpresaViewSet(viewsets.ModelViewSet):
         """
         Actualiza la empresa existente.
         """
-        empresa = Empresa.objects.first()
+        empresa = Empresa.actual()
         if not empresa:
             return Response(
                 {'error': 'No se ha configurado ninguna empresa. Use POST para crearla.'},
@@ -0,0 +1,138 @@
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from inventario.models import Libro
+from .serializers import LibroBulkSerializer
+
+MODOS = ('crear', 'actualizar', 'upsert')
+
+# Campos que se pueden cambiar en los libros existentes
+CAMPOS_ACTUALIZABLES = ['pvp', 'precio', 'descuento', 'cantidad']
+
+
+class CargaLibros:
+    """
+    Carga en bloque de libros desde una lista de filas (JSON o CSV):
+
+    - crear: cada fila es un libro nuevo (titulo obligatorio).
+    - actualizar: cada fila cambia los campos indicados del libro con ese id.
+    - upsert: actualiza el libro con ese título o lo crea si no existe.
+
+    Las filas se validan una a una y los errores se guardan en `errores`
+    ({número de fila: errores}, empezando en 1). guardar() busca los libros
+    existentes con una consulta por lote y los guarda en bloque en una sola
+    transacción (ver LibroQuerySet.guardar_en_bloque)
+    """
+
+    def __init__(self, filas, modo='upsert', lote=1000):
+        self.filas = filas
+        self.modo = modo
+        self.lote = lote
+        self.errores = {}
+        self.creados = self.actualizados = self.sin_cambios = 0
+
+    def validar(self):
+        """
+        Devuelve [(número de fila, datos validados)] de las filas correctas
+        """
+        clave = 'id' if self.modo == 'actualizar' else 'titulo'
+        vistas = {}
+        validas = []
+        # Un solo serializer para todas las filas: crearlo copia sus campos
+        serializer = LibroBulkSerializer()
+        for numero, fila in enumerate(self.filas, start=1):
+            try:
+                datos = serializer.run_validation(fila)
+            except ValidationError as e:
+                self.errores[numero] = e.detail
+                continue
+
+            if clave not in datos:
+                self.errores[numero] = {clave: ['Este campo es obligatorio en el modo ' + self.modo]}
+                continue
+            if datos[clave] in vistas:
+                self.errores[numero] = {clave: [f'Repetido en la fila {vistas[datos[clave]]}']}
+                continue
+            vistas[datos[clave]] = numero
+            validas.append((numero, datos))
+        return validas
+
+    def existentes(self, validas):
+        """
+        Libros existentes de las filas, por id o por título según el modo, leídos
+        por lotes y bloqueados hasta el final de la transacción. En modo crear
+        no se busca nada
+        """
+        if self.modo == 'crear':
+            return {}
+
+        campo = 'pk' if self.modo == 'actualizar' else 'titulo'
+        claves = [datos['id' if self.modo == 'actualizar' else 'titulo'] for _, datos in validas]
+        existentes = {}
+        for inicio in range(0, len(claves), self.lote):
+            libros = Libro.objects.select_for_update().filter(**{f'{campo}__in': claves[inicio:inicio + self.lote]})
+            for libro in libros:
+                existentes.setdefault(getattr(libro, campo), []).append(libro)
+        return existentes
+
+    @transaction.atomic
+    def guardar(self, parcial=False):
+        """
+        Valida las filas y guarda las correctas. Si hay errores y no es una carga
+        parcial no se guarda nada. Devuelve True si se ha guardado
+        """
+        validas = self.validar()
+        existentes = self.existentes(validas)
+
+        nuevos = []
+        modificados = []
+        campos = set()
+        for numero, datos in validas:
+            clave = datos['id'] if self.modo == 'actualizar' else datos['titulo']
+            libros = existentes.get(clave, [])
+            if self.modo == 'actualizar' and not libros:
+                self.errores[numero] = {'id': [f'No existe el libro con id {clave}']}
+                continue
+            if len(libros) > 1:
+                self.errores[numero] = {'titulo': [f'Hay {len(libros)} libros con este título']}
+                continue
+
+            if not libros:
+                datos.pop('id', None)
+                nuevos.append(Libro(**datos))
+                continue
+
+            libro = libros[0]
+            cambios = {
+                campo: valor
+                for campo, valor in datos.items()
+                if campo in CAMPOS_ACTUALIZABLES and getattr(libro, campo) != valor
+            }
+            if not cambios:
+                self.sin_cambios += 1
+                continue
+            for campo, valor in cambios.items():
+                setattr(libro, campo, valor)
+            campos.update(cambios)
+            modificados.append(libro)
+
+        if self.errores and not parcial:
+            return False
+
+        Libro.objects.guardar_en_bloque(
+            nuevos, modificados, sorted(campos), lote=self.lote, referencia='carga'
+        )
+        self.creados = len(nuevos)
+        self.actualizados = len(modificados)
+        return True
+
+    def resumen(self):
+        return {
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'sin_cambios': self.sin_cambios,
+            'errores': [
+                {'fila': numero, 'errores': errores}
+                for numero, errores in sorted(self.errores.items())
+            ],
+        }
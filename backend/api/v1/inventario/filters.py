@@ -2,6 +2,7 @@ import django_filters
 from inventario.models import Libro
 
 class LibroFilter(django_filters.FilterSet):
+    q = django_filters.CharFilter(method='filtrar_busqueda')
     titulo = django_filters.CharFilter(lookup_expr='icontains')
     pvp_min = django_filters.NumberFilter(field_name='pvp', lookup_expr='gte')
     pvp_max = django_filters.NumberFilter(field_name='pvp', lookup_expr='lte')
@@ -14,4 +15,10 @@ class LibroFilter(django_filters.FilterSet):
 
     class Meta:
         model = Libro
-        fields = ['titulo', 'pvp', 'precio', 'cantidad', 'descuento'] 
\ No newline at end of file
+        fields = ['titulo', 'pvp', 'precio', 'cantidad', 'descuento']
+
+    def filtrar_busqueda(self, queryset, name, value):
+        """
+        Búsqueda por título ordenada por relevancia (?q=)
+        """
+        return queryset.buscar(value) 
\ No newline at end of file
@@ -4,4 +4,30 @@ from inventario.models import Libro
 class LibroSerializer(serializers.ModelSerializer):
     class Meta:
         model = Libro
-        fields = ['id', 'titulo', 'pvp', 'precio', 'cantidad', 'descuento'] 
\ No newline at end of file
+        fields = ['id', 'titulo', 'pvp', 'precio', 'cantidad', 'descuento']
+
+class LibroBulkSerializer(serializers.Serializer):
+    """
+    Una fila de la carga en bloque de libros. Todos los campos son opcionales
+    aquí: cuáles son obligatorios depende del modo (ver LibroViewSet.bulk)
+    """
+    id = serializers.IntegerField(required=False)
+    titulo = serializers.CharField(max_length=255, required=False)
+    pvp = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    descuento = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
+    cantidad = serializers.IntegerField(required=False)
+
+class AjusteStockSerializer(serializers.Serializer):
+    """
+    Una fila del recuento de inventario: el libro y la variación de su
+    cantidad (delta) o la cantidad contada (absoluto)
+    """
+    libro_id = serializers.IntegerField()
+    delta = serializers.IntegerField(required=False)
+    absoluto = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, datos):
+        if ('delta' in datos) == ('absoluto' in datos):
+            raise serializers.ValidationError('Indique delta o absoluto, pero no ambos')
+        return datos
@@ -1,11 +1,114 @@
-from rest_framework import viewsets
+from django.core.exceptions import ValidationError
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from inventario.models import Libro
-from .serializers import LibroSerializer
+from .serializers import AjusteStockSerializer, LibroSerializer
 from .filters import LibroFilter
+from .bulk import MODOS, CargaLibros
+from ..conditional import PeticionCondicionalMixin
+from ..export import ExportacionMixin
+from ..parsers import ParserCSV
 
-class LibroViewSet(viewsets.ModelViewSet):
-    queryset = Libro.objects.all().order_by('titulo')
+class LibroViewSet(PeticionCondicionalMixin, ExportacionMixin, viewsets.ModelViewSet):
+    queryset = Libro.objects.all().order_by('titulo', 'id')
     serializer_class = LibroSerializer
     filterset_class = LibroFilter
-    filter_backends = [DjangoFilterBackend]
\ No newline at end of file
+    filter_backends = [DjangoFilterBackend]
+    orden_keyset = ['titulo', 'id']
+    cachear_listado = True
+    nombre_exportacion = 'libros'
+    columnas_exportacion = [
+        ('ID', 'id'),
+        ('Título', 'titulo'),
+        ('PVP', 'pvp'),
+        ('Precio', 'precio'),
+        ('Descuento', 'descuento'),
+        ('Cantidad', 'cantidad'),
+    ]
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, ParserCSV])
+    def bulk(self, request):
+        """
+        Crea o actualiza libros en bloque desde un array JSON o un CSV con
+        cabecera (columnas id, titulo, pvp, precio, descuento, cantidad).
+        ?modo=crear | actualizar (por id) | upsert (por título, por defecto).
+        Si alguna fila tiene errores no se guarda nada y se responde 400 con
+        los errores de cada fila; con ?parcial=true se guardan las correctas
+        """
+        modo = request.query_params.get('modo', 'upsert')
+        if modo not in MODOS:
+            return Response(
+                {'error': f"Modo no válido. Use uno de: {', '.join(MODOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(request.data, list) or not all(isinstance(fila, dict) for fila in request.data):
+            return Response(
+                {'error': 'Se esperaba una lista de libros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        carga = CargaLibros(request.data, modo)
+        parcial = request.query_params.get('parcial', 'false').lower() == 'true'
+        guardado = carga.guardar(parcial=parcial)
+        return Response(
+            carga.resumen(),
+            status=status.HTTP_200_OK if guardado else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, ParserCSV])
+    def stock(self, request):
+        """
+        Aplica un recuento de inventario desde un array JSON o un CSV con las
+        columnas libro_id y delta (variación) o absoluto (cantidad contada).
+        Todos los libros se actualizan a la vez con una sola sentencia; si
+        alguna fila tiene errores no se cambia nada y se responde 400 con los
+        errores de cada fila. Devuelve la cantidad anterior y la nueva de cada libro
+        """
+        if not isinstance(request.data, list):
+            return Response(
+                {'error': 'Se esperaba una lista de ajustes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = AjusteStockSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            errores = {numero: fila for numero, fila in enumerate(serializer.errors, start=1) if fila}
+            return self.respuesta_errores(errores)
+
+        filas = {}
+        cambios = {}
+        errores = {}
+        for numero, datos in enumerate(serializer.validated_data, start=1):
+            libro_id = datos['libro_id']
+            if libro_id in filas:
+                errores[numero] = {'libro_id': [f'Repetido en la fila {filas[libro_id]}']}
+                continue
+            filas[libro_id] = numero
+            cambios[libro_id] = (datos.get('delta'), datos.get('absoluto'))
+
+        if not errores:
+            try:
+                resultado = Libro.objects.fijar_stock(cambios, referencia='recuento')
+            except ValidationError as e:
+                errores = {filas[libro_id]: {'libro_id': mensajes} for libro_id, mensajes in e.message_dict.items()}
+
+        if errores:
+            return self.respuesta_errores(errores)
+        return Response({
+            'libros': [
+                {'libro_id': libro_id, 'cantidad_anterior': anterior, 'cantidad': cantidad}
+                for libro_id, (anterior, cantidad) in resultado.items()
+            ]
+        })
+
+    def respuesta_errores(self, errores):
+        """
+        Respuesta 400 con los errores de cada fila ({número de fila: errores})
+        """
+        return Response(
+            {'errores': [{'fila': numero, 'errores': errores[numero]} for numero in sorted(errores)]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
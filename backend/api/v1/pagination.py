@@ -0,0 +1,152 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class Paginacion(PageNumberPagination):
+    """
+    Paginación por defecto de la API con tres modos:
+
+    - ?page=N: paginación por número de página con el total de resultados (count).
+    - ?page=N&count=false: igual pero sin la consulta COUNT(*).
+    - ?cursor=: paginación por clave (keyset) sobre el orden `orden_keyset` de la
+      vista. Cada página filtra a partir de la última fila de la anterior en lugar
+      de usar OFFSET, por lo que su coste no depende de lo profunda que sea.
+
+    El tamaño de página se puede cambiar con ?page_size=N.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.modo = 'paginas'
+
+        orden = getattr(view, 'orden_keyset', None)
+        if orden and self.cursor_query_param in request.query_params:
+            self.modo = 'cursor'
+            return self.paginar_por_cursor(queryset, request, orden)
+
+        if request.query_params.get(self.count_query_param, '').lower() == 'false':
+            self.modo = 'sin_total'
+            return self.paginar_sin_total(queryset, request)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.modo == 'paginas':
+            return super().get_paginated_response(data)
+
+        return Response({
+            'next': self.siguiente,
+            'previous': self.anterior,
+            'results': data,
+        })
+
+    # Paginación por número de página sin COUNT(*)
+
+    def paginar_sin_total(self, queryset, request):
+        tamaño = self.get_page_size(request)
+        try:
+            numero = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            numero = 0
+        if numero < 1:
+            raise NotFound(self.invalid_page_message.format(page_number=numero, message=''))
+
+        # Pedir una fila más para saber si existe la página siguiente
+        inicio = (numero - 1) * tamaño
+        filas = list(queryset[inicio:inicio + tamaño + 1])
+
+        url = request.build_absolute_uri()
+        self.siguiente = None
+        if len(filas) > tamaño:
+            self.siguiente = replace_query_param(url, self.page_query_param, numero + 1)
+        self.anterior = None
+        if numero > 1:
+            self.anterior = replace_query_param(url, self.page_query_param, numero - 1)
+        return filas[:tamaño]
+
+    # Paginación por clave
+
+    def paginar_por_cursor(self, queryset, request, orden):
+        tamaño = self.get_page_size(request)
+        cursor = self.decodificar_cursor(
+            request.query_params.get(self.cursor_query_param), queryset.model, orden
+        )
+        hacia_atras = bool(cursor and cursor['atras'])
+
+        orden_consulta = [self.invertir(campo) for campo in orden] if hacia_atras else list(orden)
+        queryset = queryset.order_by(*orden_consulta)
+        if cursor:
+            queryset = queryset.filter(self.posteriores_a(orden_consulta, cursor['valores']))
+
+        filas = list(queryset[:tamaño + 1])
+        hay_mas = len(filas) > tamaño
+        filas = filas[:tamaño]
+        if hacia_atras:
+            filas.reverse()
+
+        url = remove_query_param(request.build_absolute_uri(), self.page_query_param)
+        self.siguiente = None
+        self.anterior = None
+        if filas and (hay_mas if not hacia_atras else cursor):
+            self.siguiente = self.url_cursor(url, orden, filas[-1], atras=False)
+        if filas and (hay_mas if hacia_atras else cursor):
+            self.anterior = self.url_cursor(url, orden, filas[0], atras=True)
+        return filas
+
+    @staticmethod
+    def invertir(campo):
+        return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+    @staticmethod
+    def posteriores_a(orden, valores):
+        """
+        Condición de las filas que van después de `valores` en el orden indicado:
+        (a > va) OR (a = va AND b > vb) OR ..., con < para los campos descendentes
+        """
+        condicion = Q()
+        iguales = Q()
+        for campo, valor in zip(orden, valores):
+            nombre = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            condicion |= iguales & Q(**{f'{nombre}__{operador}': valor})
+            iguales &= Q(**{nombre: valor})
+        return condicion
+
+    def url_cursor(self, url, orden, fila, atras):
+        valores = [getattr(fila, campo.lstrip('-')) for campo in orden]
+        datos = json.dumps({'valores': valores, 'atras': atras}, cls=DjangoJSONEncoder)
+        cursor = base64.urlsafe_b64encode(datos.encode()).decode()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decodificar_cursor(self, cursor, modelo, orden):
+        """
+        Lee el cursor de la URL y convierte cada valor con el campo del modelo
+        al que corresponde en el orden. Un cursor manipulado responde 404 en
+        lugar de fallar al filtrar
+        """
+        if not cursor:
+            return None
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            valores = list(datos['valores'])
+            if len(valores) != len(orden):
+                raise ValueError
+            campos = [modelo._meta.get_field(campo.lstrip('-')) for campo in orden]
+            valores = [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+            if None in valores:
+                raise ValueError
+            return {'valores': valores, 'atras': bool(datos['atras'])}
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound('Cursor no válido')
@@ -0,0 +1,29 @@
+import codecs
+import csv
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class ParserCSV(BaseParser):
+    """
+    Lee un CSV con cabecera como una lista de diccionarios (uno por fila), igual
+    que un array JSON. Las celdas vacías se omiten para que cuenten como campos
+    no enviados. Admite el BOM que añade Excel al guardar en UTF-8
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        codificacion = parser_context.get('encoding') or 'utf-8'
+        if codificacion.lower().replace('-', '') == 'utf8':
+            codificacion = 'utf-8-sig'
+
+        try:
+            lector = csv.DictReader(codecs.iterdecode(stream, codificacion))
+            return [
+                {columna.strip(): valor for columna, valor in fila.items() if columna and valor not in ('', None)}
+                for fila in lector
+            ]
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ParseError(f'CSV no válido: {e}')
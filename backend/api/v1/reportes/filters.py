@@ -0,0 +1,30 @@
+import django_filters
+from reportes.models import PERIODOS, FacturasEstado, VentasCliente, VentasLibro
+
+class ResumenFilter(django_filters.FilterSet):
+    periodo = django_filters.ChoiceFilter(choices=PERIODOS)
+    fecha = django_filters.DateFromToRangeFilter()
+
+    def __init__(self, data=None, *args, **kwargs):
+        # Sin ?periodo= se usan los resúmenes mensuales para no mezclar días y meses
+        if data is not None and not data.get('periodo'):
+            data = data.copy()
+            data['periodo'] = 'mes'
+        super().__init__(data, *args, **kwargs)
+
+class VentasLibroFilter(ResumenFilter):
+    class Meta:
+        model = VentasLibro
+        fields = ['periodo', 'fecha', 'libro']
+
+class VentasClienteFilter(ResumenFilter):
+    cliente = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = VentasCliente
+        fields = ['periodo', 'fecha', 'cliente']
+
+class FacturasEstadoFilter(ResumenFilter):
+    class Meta:
+        model = FacturasEstado
+        fields = ['periodo', 'fecha', 'estado']
@@ -0,0 +1,44 @@
+from rest_framework import serializers
+from reportes.models import FacturasEstado, VentasCliente, VentasLibro
+
+class VentasLibroSerializer(serializers.ModelSerializer):
+    titulo = serializers.CharField(source='libro.titulo', read_only=True)
+
+    class Meta:
+        model = VentasLibro
+        fields = ['periodo', 'fecha', 'libro', 'titulo', 'unidades', 'importe']
+
+class VentasClienteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VentasCliente
+        fields = ['periodo', 'fecha', 'cliente', 'facturas', 'base_iva', 'total']
+
+class FacturasEstadoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FacturasEstado
+        fields = ['periodo', 'fecha', 'estado', 'facturas', 'total']
+
+class VentanaSerializer(serializers.Serializer):
+    """
+    Parámetros de los informes por intervalo de fechas
+    """
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    limite = serializers.IntegerField(min_value=1, max_value=1000, default=20)
+    orden = serializers.ChoiceField(choices=['unidades', 'importe'], default='unidades')
+
+    def validate(self, data):
+        if data['desde'] > data['hasta']:
+            raise serializers.ValidationError('La fecha desde debe ser anterior a hasta')
+        return data
+
+class LibroVendidoSerializer(serializers.Serializer):
+    libro = serializers.IntegerField()
+    titulo = serializers.CharField(source='libro__titulo')
+    stock = serializers.IntegerField(source='libro__cantidad')
+    unidades = serializers.IntegerField()
+    importe = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class RotacionLibroSerializer(LibroVendidoSerializer):
+    rotacion = serializers.FloatField(allow_null=True)
+    dias_cobertura = serializers.FloatField()
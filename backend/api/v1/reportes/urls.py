@@ -0,0 +1,12 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import FacturasEstadoViewSet, VentasClienteViewSet, VentasLibroViewSet
+
+router = DefaultRouter()
+router.register(r'ventas-libros', VentasLibroViewSet)
+router.register(r'ventas-clientes', VentasClienteViewSet)
+router.register(r'facturas-estado', FacturasEstadoViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,63 @@
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from reportes.models import FacturasEstado, VentasCliente, VentasLibro
+from .serializers import FacturasEstadoSerializer, VentasClienteSerializer, VentasLibroSerializer, VentanaSerializer, LibroVendidoSerializer, RotacionLibroSerializer
+from .filters import FacturasEstadoFilter, VentasClienteFilter, VentasLibroFilter
+
+class VentasLibroViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Unidades e importe vendidos de cada libro por día o por mes (?periodo=dia|mes)
+    """
+    queryset = VentasLibro.objects.select_related('libro').order_by('-fecha', '-id')
+    serializer_class = VentasLibroSerializer
+    filterset_class = VentasLibroFilter
+    filter_backends = [DjangoFilterBackend]
+    orden_keyset = ['-fecha', '-id']
+
+    def parametros_ventana(self):
+        parametros = VentanaSerializer(data=self.request.query_params)
+        parametros.is_valid(raise_exception=True)
+        return parametros.validated_data
+
+    @action(detail=False, methods=['get'], url_path='mas-vendidos')
+    def mas_vendidos(self, request):
+        """
+        Los libros más vendidos entre ?desde= y ?hasta= (?limite=20, ?orden=unidades|importe)
+        """
+        ventana = self.parametros_ventana()
+        libros = VentasLibro.objects.mas_vendidos(
+            ventana['desde'], ventana['hasta'], ventana['limite'], ventana['orden']
+        )
+        return Response(LibroVendidoSerializer(libros, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def rotacion(self, request):
+        """
+        Libros con mayor rotación de stock (unidades vendidas / stock actual)
+        entre ?desde= y ?hasta= (?limite=20)
+        """
+        ventana = self.parametros_ventana()
+        libros = VentasLibro.objects.rotacion(ventana['desde'], ventana['hasta'], ventana['limite'])
+        return Response(RotacionLibroSerializer(libros, many=True).data)
+
+class VentasClienteViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Facturas, base imponible y total de cada cliente por día o por mes (?periodo=dia|mes)
+    """
+    queryset = VentasCliente.objects.order_by('-fecha', '-id')
+    serializer_class = VentasClienteSerializer
+    filterset_class = VentasClienteFilter
+    filter_backends = [DjangoFilterBackend]
+    orden_keyset = ['-fecha', '-id']
+
+class FacturasEstadoViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Número de facturas y total por estado por día o por mes (?periodo=dia|mes)
+    """
+    queryset = FacturasEstado.objects.order_by('-fecha', '-id')
+    serializer_class = FacturasEstadoSerializer
+    filterset_class = FacturasEstadoFilter
+    filter_backends = [DjangoFilterBackend]
+    orden_keyset = ['-fecha', '-id']
@@ -1,6 +1,10 @@
 from django.urls import path, include
 
+from .cache import EstadisticasCacheView
+
 urlpatterns = [
     path('inventario/', include('api.v1.inventario.urls')),
     path('facturacion/', include('api.v1.facturacion.urls')),
+    path('reportes/', include('api.v1.reportes.urls')),
+    path('cache/', EstadisticasCacheView.as_view(), name='cache-estadisticas'),
 ] 
\ No newline at end of file
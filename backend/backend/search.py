@@ -0,0 +1,154 @@
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+# Los trigramas necesitan al menos tres caracteres; las palabras más cortas
+# se buscan con icontains
+LONGITUD_MINIMA_TRIGRAMA = 3
+
+
+def palabras_busqueda(texto):
+    return [palabra for palabra in texto.split() if palabra]
+
+
+def contiene_palabras(palabras, campos):
+    """
+    Condición de las filas que contienen todas las palabras, cada una en alguno de los campos
+    """
+    condicion = Q()
+    for palabra in palabras:
+        en_algun_campo = Q()
+        for campo in campos:
+            en_algun_campo |= Q(**{f'{campo}__icontains': palabra})
+        condicion &= en_algun_campo
+    return condicion
+
+
+def buscar(queryset, texto, campos):
+    """
+    Filtra el queryset por las filas que contienen todas las palabras de `texto`
+    en alguno de los `campos` y las ordena por relevancia (anotada como
+    `relevancia`, mayor es mejor), manteniendo el orden original para empates.
+
+    - PostgreSQL: icontains sobre índices GIN de pg_trgm en UPPER(campo) y
+      relevancia por similitud de trigramas con word_similarity.
+    - SQLite: tabla FTS5 con el tokenizador trigram (ver crear_busqueda_sqlite)
+      y relevancia por bm25.
+    - Otros motores: icontains sin relevancia.
+    """
+    palabras = palabras_busqueda(texto)
+    if not palabras:
+        return queryset
+
+    orden = queryset.query.order_by or queryset.model._meta.ordering
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similitudes = [TrigramWordSimilarity(texto, campo) for campo in campos]
+        relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+        queryset = queryset.filter(contiene_palabras(palabras, campos))
+    elif vendor == 'sqlite':
+        largas = [palabra for palabra in palabras if len(palabra) >= LONGITUD_MINIMA_TRIGRAMA]
+        cortas = [palabra for palabra in palabras if len(palabra) < LONGITUD_MINIMA_TRIGRAMA]
+        queryset = queryset.filter(contiene_palabras(cortas, campos))
+        relevancia = Value(0.0)
+        if largas:
+            tabla = queryset.model._meta.db_table
+            tabla_fts = f'{tabla}_fts'
+            # Cada palabra entre comillas como cadena FTS5; el espacio entre ellas es un AND
+            consulta = ' '.join('"{}"'.format(palabra.replace('"', '""')) for palabra in largas)
+            queryset = queryset.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM "{tabla_fts}" WHERE "{tabla_fts}" MATCH %s', (consulta,)
+            ))
+            # rank es bm25 en negativo: cuanto menor, más relevante
+            relevancia = RawSQL(
+                f'SELECT -rank FROM "{tabla_fts}" WHERE "{tabla_fts}" MATCH %s '
+                f'AND rowid = "{tabla}"."{queryset.model._meta.pk.column}"',
+                (consulta,),
+                output_field=FloatField(),
+            )
+    else:
+        relevancia = Value(0.0)
+        queryset = queryset.filter(contiene_palabras(palabras, campos))
+
+    return queryset.annotate(relevancia=relevancia).order_by('-relevancia', *orden)
+
+
+def indices_busqueda(tabla, columnas):
+    """
+    Operación de migración que crea en PostgreSQL la extensión pg_trgm y un índice
+    GIN de trigramas por columna. Se indexa UPPER(columna) porque es la expresión
+    que genera icontains en PostgreSQL, así que también aceleran los filtros
+    existentes. En otros motores no hace nada; en SQLite la búsqueda usa FTS5 y se
+    prepara después de cada migrate (ver crear_busqueda_sqlite).
+    """
+    from django.db import migrations
+
+    indices = {columna: f'{tabla}_{columna}_trgm' for columna in columnas}
+
+    def crear(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for columna, indice in indices.items():
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{indice}" ON "{tabla}" '
+                f'USING gin (UPPER("{columna}") gin_trgm_ops)'
+            )
+
+    def borrar(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for indice in indices.values():
+            schema_editor.execute(f'DROP INDEX IF EXISTS "{indice}"')
+
+    return migrations.RunPython(crear, borrar)
+
+
+def crear_busqueda_sqlite(sender, using='default', **kwargs):
+    """
+    Receptor de post_migrate que crea en SQLite una tabla FTS5 (tokenizador
+    trigram) por cada modelo de la app con `campos_busqueda`, con disparadores
+    que la mantienen sincronizada, y la reconstruye. Se hace tras cada migrate
+    porque SQLite rehace las tablas al alterarlas y con ello borra los disparadores.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for modelo in sender.get_models():
+            if not getattr(modelo, 'campos_busqueda', None):
+                continue
+
+            tabla = modelo._meta.db_table
+            tabla_fts = f'{tabla}_fts'
+            pk = modelo._meta.pk.column
+            columnas = [modelo._meta.get_field(campo).column for campo in modelo.campos_busqueda]
+            lista = ', '.join(f'"{columna}"' for columna in columnas)
+            nuevos = ', '.join(f'new."{columna}"' for columna in columnas)
+            viejos = ', '.join(f'old."{columna}"' for columna in columnas)
+
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS "{tabla_fts}" USING fts5('
+                f"{lista}, content='{tabla}', content_rowid='{pk}', tokenize='trigram')"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{tabla_fts}_ai" AFTER INSERT ON "{tabla}" BEGIN '
+                f'INSERT INTO "{tabla_fts}"(rowid, {lista}) VALUES (new."{pk}", {nuevos}); END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{tabla_fts}_ad" AFTER DELETE ON "{tabla}" BEGIN '
+                f'INSERT INTO "{tabla_fts}"("{tabla_fts}", rowid, {lista}) '
+                f"VALUES ('delete', old.\"{pk}\", {viejos}); END"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{tabla_fts}_au" AFTER UPDATE OF {lista} ON "{tabla}" BEGIN '
+                f'INSERT INTO "{tabla_fts}"("{tabla_fts}", rowid, {lista}) '
+                f"VALUES ('delete', old.\"{pk}\", {viejos}); "
+                f'INSERT INTO "{tabla_fts}"(rowid, {lista}) VALUES (new."{pk}", {nuevos}); END'
+            )
+            cursor.execute(f'INSERT INTO "{tabla_fts}"("{tabla_fts}") VALUES (\'rebuild\')')
@@ -0,0 +1,98 @@
+from django.utils import timezone
+
+
+class SeguimientoCamposMixin:
+    """
+    Conserva los valores cargados desde la base de datos para detectar cambios
+    sin consultas adicionales y, al actualizar, escribe solo las columnas modificadas
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_valores_cargados()
+        return instance
+
+    def _guardar_valores_cargados(self):
+        # Los campos diferidos no están en __dict__ y no se consultan
+        self._valores_cargados = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self._guardar_valores_cargados()
+            return
+
+        # Recarga parcial: actualizar solo los valores de los campos recargados
+        valores_cargados = getattr(self, '_valores_cargados', {})
+        for campo in fields:
+            attname = self._meta.get_field(campo).attname
+            if attname in self.__dict__:
+                valores_cargados[attname] = self.__dict__[attname]
+        self._valores_cargados = valores_cargados
+
+    def valor_anterior(self, campo):
+        """
+        Devuelve el valor de `campo` tal y como está guardado. Solo consulta la
+        base de datos si la instancia no se cargó desde ella
+        """
+        attname = self._meta.get_field(campo).attname
+        valores_cargados = getattr(self, '_valores_cargados', None)
+        if valores_cargados is not None and attname in valores_cargados:
+            return valores_cargados[attname]
+        return type(self)._default_manager.filter(pk=self.pk).values_list(attname, flat=True).first()
+
+    def campos_modificados(self):
+        """
+        Devuelve los nombres de los campos cuyo valor difiere del cargado
+        """
+        valores_cargados = getattr(self, '_valores_cargados', {})
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (
+                field.attname not in valores_cargados
+                or self.__dict__[field.attname] != valores_cargados[field.attname]
+            )
+        ]
+
+    def actualizar_campos(self, **valores):
+        """
+        Asigna y guarda los campos indicados con un UPDATE directo, sin llamar a save().
+        Los campos auto_now (updated_on) se actualizan igual que con save()
+        """
+        for field in self._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) and field.name not in valores:
+                valores[field.name] = timezone.now()
+        for campo, valor in valores.items():
+            setattr(self, campo, valor)
+        type(self)._default_manager.filter(pk=self.pk).update(**valores)
+        if hasattr(self, '_valores_cargados'):
+            for campo in valores:
+                attname = self._meta.get_field(campo).attname
+                self._valores_cargados[attname] = self.__dict__[attname]
+
+    def save(self, *args, **kwargs):
+        # En actualizaciones de instancias cargadas escribir solo lo modificado
+        if (
+            not args
+            and not self._state.adding
+            and hasattr(self, '_valores_cargados')
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            update_fields = self.campos_modificados()
+            update_fields += [
+                field.name
+                for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False) and field.name not in update_fields
+            ]
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+        self._guardar_valores_cargados()
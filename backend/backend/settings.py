@@ -101,6 +101,29 @@ DATABASES = {
 }
 
 
+# Cachés
+# 'api' guarda los datos de las páginas de los listados de la API (ver
+# api/v1/cache.py). Por defecto en memoria local de cada proceso, con expulsión
+# de las entradas menos usadas (LRU); API_CACHE_BACKEND y API_CACHE_LOCATION
+# permiten compartirla con FileBasedCache o RedisCache
+
+API_CACHE_BACKEND = os.getenv('API_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': API_CACHE_BACKEND,
+        'LOCATION': os.getenv('API_CACHE_LOCATION', 'api'),
+        'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', 24 * 3600)),
+    },
+}
+if 'redis' not in API_CACHE_BACKEND.lower():
+    # Número máximo de páginas guardadas (no aplica a Redis, que usa su propia política)
+    CACHES['api']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('API_CACHE_MAX_ENTRIES', 2000))}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -144,6 +167,21 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Caché de PDFs de facturas renderizados
+FACTURAS_PDF_CACHE_DIR = os.path.join(MEDIA_ROOT, 'facturas_pdf')
+FACTURAS_PDF_CACHE_MAX_BYTES = int(os.getenv('FACTURAS_PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Procesos que renderizan PDFs en paralelo
+FACTURAS_PDF_PROCESOS = int(os.getenv('FACTURAS_PDF_PROCESOS', os.cpu_count() or 1))
+
+# Segundos tras los que un trabajo de PDF reservado y sin terminar se da por
+# abandonado y vuelve a la cola (ver TrabajoPDF.recuperar_abandonados)
+FACTURAS_PDF_CADUCIDAD_RESERVA = int(os.getenv('FACTURAS_PDF_CADUCIDAD_RESERVA', 600))
+
+# Sello de versión de la configuración de la empresa. Cada proceso guarda la
+# empresa en memoria y la vuelve a leer cuando cambia este fichero (ver Empresa.actual)
+EMPRESA_VERSION_PATH = os.getenv('EMPRESA_VERSION_PATH', os.path.join(MEDIA_ROOT, 'empresa.version'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -161,7 +199,7 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.v1.pagination.Paginacion',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'backend.middleware.APIKeyAuthentication',
@@ -0,0 +1,104 @@
+import csv
+import re
+import tempfile
+from datetime import datetime
+
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+
+class SalidaStreaming:
+    """
+    Fichero de solo escritura y sin posicionamiento: zipfile escribe los datos
+    en streaming y aquí se recogen para enviarlos en cada iteración
+    """
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+class _Eco:
+    """
+    Pseudo fichero para csv.writer que devuelve la línea en lugar de guardarla
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def csv_streaming(cabeceras, filas, lote=1000):
+    """
+    Genera por partes un CSV con las filas indicadas, en bloques de `lote` filas.
+    Empieza con BOM para que Excel detecte la codificación UTF-8
+    """
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(cabeceras)
+
+    bloque = []
+    for fila in filas:
+        bloque.append(escritor.writerow(fila))
+        if len(bloque) >= lote:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+# Caracteres de control que no admite XML 1.0 (openpyxl los rechaza)
+_CARACTERES_NO_VALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _valor_excel(valor):
+    """
+    Adapta el valor a lo que admite una celda de Excel: las fechas y horas en
+    la zona horaria local y sin tzinfo, y los textos sin caracteres de control
+    """
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.replace(tzinfo=None)
+    if isinstance(valor, str):
+        return _CARACTERES_NO_VALIDOS.sub('', valor)
+    return valor
+
+
+def xlsx_streaming(cabeceras, filas, hoja='Hoja1', bloque=64 * 1024):
+    """
+    Genera por partes un libro XLSX de una hoja con las filas indicadas. openpyxl
+    en modo de solo escritura vuelca las filas a un fichero temporal a medida que
+    llegan y el libro se monta en otro, que se envía en bloques de `bloque`
+    bytes: la memoria usada no depende del número de filas
+    """
+    libro = Workbook(write_only=True)
+    hoja_excel = libro.create_sheet(title=hoja[:31])
+
+    negrita = Font(bold=True)
+    celdas_cabecera = []
+    for cabecera in cabeceras:
+        celda = WriteOnlyCell(hoja_excel, value=_valor_excel(cabecera))
+        celda.font = negrita
+        celdas_cabecera.append(celda)
+    hoja_excel.append(celdas_cabecera)
+
+    for fila in filas:
+        hoja_excel.append([_valor_excel(valor) for valor in fila])
+
+    with tempfile.TemporaryFile() as fichero:
+        libro.save(fichero)
+        fichero.seek(0)
+        while datos := fichero.read(bloque):
+            yield datos
@@ -0,0 +1,31 @@
+from django.db import models
+from django.dispatch import Signal
+
+# Se envía cuando una escritura en bloque (update, bulk_create) modifica filas
+# de un modelo versionado, que no generan post_save ni post_delete.
+# El sender es el modelo modificado.
+tabla_modificada = Signal()
+
+
+class VersionadoQuerySet(models.QuerySet):
+    """
+    QuerySet de los modelos cuya versión de tabla se usa para validar la caché
+    de la API: avisa con tabla_modificada de las escrituras en bloque. Los
+    borrados ya envían post_delete por cada fila
+    """
+
+    def update(self, **kwargs):
+        filas = super().update(**kwargs)
+        if filas:
+            tabla_modificada.send(sender=self.model)
+        return filas
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            tabla_modificada.send(sender=self.model)
+        return objs
+
+    bulk_create.alters_data = True
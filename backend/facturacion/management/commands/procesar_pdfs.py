@@ -0,0 +1,101 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from facturacion.models import TrabajoPDF
+from facturacion.pdf import generar_pdf
+
+
+class Command(BaseCommand):
+    help = "Renderiza en segundo plano los PDFs de facturas encolados en TrabajoPDF"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=settings.FACTURAS_PDF_PROCESOS,
+            help="Número de procesos que renderizan PDFs en paralelo"
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help="Segundos de espera cuando no hay trabajos pendientes"
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help="Procesar los trabajos pendientes y terminar"
+        )
+        parser.add_argument(
+            '--caducidad',
+            type=int,
+            default=settings.FACTURAS_PDF_CADUCIDAD_RESERVA,
+            help="Segundos tras los que un trabajo en proceso se da por abandonado y se reintenta"
+        )
+
+    def crear_pool(self, procesos):
+        # Los procesos hijos arrancan limpios ('spawn') y abren sus propias
+        # conexiones a la base de datos en lugar de heredar la del padre
+        return ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def handle(self, *args, **options):
+        procesos = options['procesos']
+        pool = self.crear_pool(procesos)
+        try:
+            while True:
+                trabajos = TrabajoPDF.reservar(procesos * 2, caducidad=options['caducidad'])
+                if not trabajos:
+                    if options['una_vez']:
+                        break
+                    connections.close_all()
+                    time.sleep(options['intervalo'])
+                    continue
+
+                if not self.procesar(pool, trabajos):
+                    # Un proceso hijo ha muerto (p. ej. sin memoria): el pool ya no
+                    # acepta trabajos, así que se sustituye por uno nuevo
+                    self.stderr.write("El pool de procesos se ha roto; se crea uno nuevo")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.crear_pool(procesos)
+
+                self.stdout.write(f"Procesados {len(trabajos)} trabajos de PDF")
+        finally:
+            pool.shutdown()
+
+    def procesar(self, pool, trabajos):
+        """
+        Renderiza los trabajos en el pool y anota el resultado de cada uno.
+        Devuelve False si el pool se ha roto; los trabajos afectados se dan por
+        fallidos y vuelven a la cola mientras les queden intentos
+        """
+        futuros = {}
+        for trabajo in trabajos:
+            try:
+                futuros[pool.submit(generar_pdf, trabajo.factura_id, trabajo.mostrar_iban)] = trabajo
+            except BrokenProcessPool as e:
+                trabajo.fallar(e)
+
+        pool_sano = len(futuros) == len(trabajos)
+        for futuro in as_completed(futuros):
+            trabajo = futuros[futuro]
+            try:
+                futuro.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    pool_sano = False
+                trabajo.fallar(e)
+                self.stderr.write(f"Error renderizando el PDF de la factura {trabajo.factura_id}: {e}")
+            else:
+                trabajo.completar()
+        return pool_sano
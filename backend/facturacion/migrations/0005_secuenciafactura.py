@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0004_empresa"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SecuenciaFactura",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ejercicio",
+                    models.PositiveIntegerField(
+                        help_text="Año al que pertenece la numeración", unique=True
+                    ),
+                ),
+                (
+                    "ultimo_numero",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Último número de factura asignado en el ejercicio",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Secuencia de Factura",
+                "verbose_name_plural": "Secuencias de Factura",
+            },
+        ),
+    ]
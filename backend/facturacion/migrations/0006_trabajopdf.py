@@ -0,0 +1,85 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0005_secuenciafactura"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrabajoPDF",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "mostrar_iban",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Renderizar la variante del PDF que muestra el IBAN",
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("procesando", "Procesando"),
+                            ("completado", "Completado"),
+                            ("error", "Error"),
+                        ],
+                        default="pendiente",
+                        help_text="Estado del trabajo en la cola",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "intentos",
+                    models.PositiveSmallIntegerField(
+                        default=0,
+                        help_text="Número de veces que se ha intentado renderizar",
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True,
+                        help_text="Último error producido al renderizar",
+                        null=True,
+                    ),
+                ),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                (
+                    "factura",
+                    models.ForeignKey(
+                        help_text="Factura cuyo PDF se debe renderizar",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trabajos_pdf",
+                        to="facturacion.factura",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trabajo de PDF",
+                "verbose_name_plural": "Trabajos de PDF",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "id"], name="facturacion_estado_459624_idx"
+                    )
+                ],
+            },
+        ),
+    ]
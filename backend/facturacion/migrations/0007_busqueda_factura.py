@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from backend.search import indices_busqueda
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0006_trabajopdf"),
+    ]
+
+    operations = [
+        indices_busqueda("facturacion_factura", ["numero", "cliente", "nombre"]),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0007_busqueda_factura"),
+        ("inventario", "0004_busqueda_titulo"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(fields=["-fecha", "-id"], name="factura_fecha_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(
+                fields=["estado", "-fecha", "-id"], name="factura_estado_fecha_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(
+                condition=models.Q(("numero__isnull", False)),
+                fields=["numero"],
+                name="factura_numero_prefijo_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(
+                condition=models.Q(("fecha_pago__isnull", False)),
+                fields=["fecha_pago"],
+                name="factura_fecha_pago_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="factura",
+            index=models.Index(fields=["total"], name="factura_total_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lineafactura",
+            index=models.Index(
+                fields=["libro", "factura"], name="lineafactura_libro_idx"
+            ),
+        ),
+    ]
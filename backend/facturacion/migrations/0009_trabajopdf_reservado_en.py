@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("facturacion", "0008_indices_factura"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trabajopdf",
+            name="reservado_en",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Fecha y hora en que un proceso reservó el trabajo por última vez",
+                null=True,
+            ),
+        ),
+    ]
@@ -1,9 +1,20 @@
-from django.db import models
+import copy
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from inventario.models import Libro
+from backend.search import buscar
+from backend.seguimiento import SeguimientoCamposMixin
+from backend.versiones import VersionadoQuerySet
+from .signals import estado_facturas_cambiado
 from decimal import Decimal
+from collections import defaultdict
 
 User = get_user_model()
 
@@ -16,6 +27,9 @@ class Empresa(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    # Empresa guardada en memoria en este proceso: (sello de versión, empresa)
+    _cache = None
+
     def __str__(self):
         return self.nombre
     
@@ -23,7 +37,121 @@ class Empresa(models.Model):
         verbose_name = "Empresa"
         verbose_name_plural = "Empresas"
 
-class Factura(models.Model):
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(Empresa.publicar_version)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        transaction.on_commit(Empresa.publicar_version)
+        return resultado
+
+    @classmethod
+    def actual(cls):
+        """
+        Devuelve la empresa configurada (None si no hay ninguna) sin consultar la
+        base de datos mientras no cambie. Cada proceso la guarda en memoria junto
+        con el sello de versión que había al leerla, y solo vuelve a consultarla
+        cuando el sello es otro. Devuelve una copia para que los cambios del
+        llamador no afecten a la guardada
+        """
+        sello = cls.sello_version()
+        cache = cls._cache
+        if cache is None or cache[0] != sello:
+            # El sello se lee antes que la fila: nunca se guarda una empresa
+            # más antigua que su sello
+            cache = cls._cache = (sello, cls.objects.order_by('pk').first())
+        return copy.copy(cache[1])
+
+    @staticmethod
+    def sello_version():
+        """
+        Sello de la última modificación de la empresa, compartido por todos los
+        procesos del servidor (workers y procesos de PDFs) en EMPRESA_VERSION_PATH
+        """
+        try:
+            with open(settings.EMPRESA_VERSION_PATH) as fichero:
+                return fichero.read()
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def publicar_version(cls):
+        """
+        Escribe un sello nuevo al confirmar un cambio de la empresa, lo que
+        invalida la copia en memoria de todos los procesos. El fichero se
+        sustituye de forma atómica para que nunca se lea a medio escribir
+        """
+        ruta = settings.EMPRESA_VERSION_PATH
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        sello = uuid.uuid4().hex
+        temporal = f'{ruta}.{sello}.tmp'
+        with open(temporal, 'w') as fichero:
+            fichero.write(sello)
+        os.replace(temporal, ruta)
+        cls._cache = None
+
+class FacturaQuerySet(VersionadoQuerySet):
+    @transaction.atomic
+    def emitir(self):
+        """
+        Emite en bloque los borradores del queryset. Reserva un bloque contiguo
+        de números por ejercicio, calcula los totales con una única consulta
+        agrupada y guarda todas las facturas con un bulk_update.
+        Devuelve la lista de facturas emitidas
+        """
+        facturas = list(
+            self.filter(estado='borrador').select_for_update().order_by('fecha', 'id')
+        )
+        if not facturas:
+            return []
+
+        bases = dict(
+            LineaFactura.objects.filter(factura__in=facturas)
+            .order_by()
+            .values('factura_id')
+            .annotate(base=Sum('importe'))
+            .values_list('factura_id', 'base')
+        )
+
+        por_ejercicio = defaultdict(list)
+        for factura in facturas:
+            por_ejercicio[factura.fecha.year].append(factura)
+
+        ahora = timezone.now()
+        for ejercicio, lote in por_ejercicio.items():
+            primer_numero = SecuenciaFactura.reservar(ejercicio, len(lote))
+            for posicion, factura in enumerate(lote):
+                factura.numero = Factura.formatear_numero_factura(ejercicio, primer_numero + posicion)
+                factura.numero_borrador = None
+                factura.estado = 'emitida'
+                factura.updated_on = ahora
+                factura.calcular_totales(base=bases.get(factura.pk, Decimal('0.00')))
+
+        Factura.objects.bulk_update(
+            facturas,
+            ['numero', 'numero_borrador', 'estado', 'base_iva', 'total', 'updated_on'],
+            batch_size=500,
+        )
+        for factura in facturas:
+            factura._guardar_valores_cargados()
+
+        TrabajoPDF.encolar(facturas)
+        estado_facturas_cambiado.send(
+            sender=Factura,
+            facturas=facturas,
+            estados_anteriores={factura.pk: 'borrador' for factura in facturas},
+        )
+        return facturas
+
+    def buscar(self, texto):
+        """
+        Busca facturas por número, cliente o nombre ordenadas por relevancia
+        """
+        return buscar(self, texto, Factura.campos_busqueda)
+
+
+class Factura(SeguimientoCamposMixin, models.Model):
     ESTADOS_FACTURA = [
         ("borrador", "Borrador"),
         ("emitida", "Emitida"),
@@ -183,70 +311,92 @@ class Factura(models.Model):
         verbose_name = "Factura"
         verbose_name_plural = "Facturas"
         ordering = ["-fecha", "-numero"]
+        indexes = [
+            # Listado por defecto y paginación por clave (-fecha, -id)
+            models.Index(fields=['-fecha', '-id'], name='factura_fecha_idx'),
+            # Listados filtrados por estado
+            models.Index(fields=['estado', '-fecha', '-id'], name='factura_estado_fecha_idx'),
+            # Búsquedas por prefijo del número (F-2025-...) de las facturas numeradas
+            models.Index(
+                fields=['numero'],
+                name='factura_numero_prefijo_idx',
+                opclasses=['varchar_pattern_ops'],
+                condition=models.Q(numero__isnull=False),
+            ),
+            models.Index(
+                fields=['fecha_pago'],
+                name='factura_fecha_pago_idx',
+                condition=models.Q(fecha_pago__isnull=False),
+            ),
+            models.Index(fields=['total'], name='factura_total_idx'),
+        ]
+
+    objects = FacturaQuerySet.as_manager()
+
+    # Campos indexados para la búsqueda de texto (ver backend.search)
+    campos_busqueda = ['numero', 'cliente', 'nombre']
+
+    # Únicos campos que se pueden cambiar una vez emitida la factura: los del
+    # pago y la anulación. El resto ya cuenta en los resúmenes de ventas
+    campos_editables_emitida = ['estado', 'fecha_pago', 'motivo_anulacion', 'fecha_anulacion', 'notas']
 
     def __str__(self):
         if self.numero:
             return f"Factura {self.numero} - {self.get_estado_display()}"
         return f"Factura {self.numero_borrador or self.id} - {self.get_estado_display()}"
 
+    def cantidades_por_libro(self):
+        """
+        Devuelve la cantidad total de cada libro en las líneas de la factura ({libro_id: cantidad})
+        """
+        return dict(
+            self.lineas.order_by()
+            .values('libro_id')
+            .annotate(total=Sum('cantidad'))
+            .values_list('libro_id', 'total')
+        )
+
+    @property
+    def referencia_stock(self):
+        """
+        Referencia con la que se registran los movimientos de stock de la factura
+        """
+        return f'factura:{self.pk}'
+
     def reducir_stock_libros(self):
         """
         Reduce el stock de todos los libros en las líneas de la factura
         """
-        for linea in self.lineas.all():
-            libro = linea.libro
-            if libro.cantidad >= linea.cantidad:
-                libro.cantidad -= linea.cantidad
-                libro.save()
-            else:
-                raise ValidationError(
-                    f"No hay suficiente stock del libro '{libro.titulo}'. "
-                    f"Stock disponible: {libro.cantidad}, Cantidad solicitada: {linea.cantidad}"
-                )
+        Libro.objects.reducir_stock(self.cantidades_por_libro(), referencia=self.referencia_stock)
 
     def recuperar_stock_libros(self):
         """
         Recupera el stock de todos los libros en las líneas de la factura
         """
-        for linea in self.lineas.all():
-            libro = linea.libro
-            libro.cantidad += linea.cantidad
-            libro.save()
+        Libro.objects.aumentar_stock(self.cantidades_por_libro(), referencia=self.referencia_stock)
 
     def verificar_stock_disponible(self):
         """
         Verifica que haya suficiente stock para todos los libros en la factura
         """
-        for linea in self.lineas.all():
-            libro = linea.libro
-            if libro.cantidad < linea.cantidad:
-                raise ValidationError(
-                    f"No hay suficiente stock del libro '{libro.titulo}'. "
-                    f"Stock disponible: {libro.cantidad}, Cantidad solicitada: {linea.cantidad}"
-                )
+        errores = Libro.objects.errores_stock(self.cantidades_por_libro())
+        if errores:
+            raise ValidationError(errores)
+
+    @staticmethod
+    def formatear_numero_factura(ejercicio, numero):
+        """
+        Da formato al número oficial de factura (F-AAAA-NNNN)
+        """
+        return f'F-{ejercicio}-{numero:04d}'
 
     def generar_numero_factura(self):
         """
         Genera el siguiente número de factura disponible para el año de la factura
         """
-        from django.db.models import Max
         año_factura = self.fecha.year
-        
-        # Buscar la última factura del año de la factura
-        ultima_factura = Factura.objects.filter(
-            numero__startswith=f'F-{año_factura}-',
-            estado__in=['emitida', 'pagada', 'anulada']
-        ).aggregate(
-            Max('numero')
-        )['numero__max']
-        
-        if ultima_factura:
-            ultimo_numero = int(ultima_factura.split('-')[-1])
-            siguiente_numero = ultimo_numero + 1
-        else:
-            siguiente_numero = 1
-            
-        return f'F-{año_factura}-{siguiente_numero:04d}'
+        siguiente_numero = SecuenciaFactura.reservar(año_factura)
+        return self.formatear_numero_factura(año_factura, siguiente_numero)
 
     def generar_numero_borrador(self):
         """
@@ -258,12 +408,16 @@ class Factura(models.Model):
         else:
             return f'BORRADOR-{self.fecha.year}'
 
-    def calcular_totales(self):
+    def calcular_totales(self, base=None):
         """
-        Calcula los totales de la factura basándose en sus líneas
+        Calcula los totales de la factura basándose en sus líneas.
+        La suma de importes se obtiene con una única consulta de agregación,
+        salvo que se reciba ya calculada en `base`
         """
         # Calcular base imponible
-        base = sum(linea.importe or Decimal('0.00') for linea in self.lineas.all())
+        if base is None:
+            base = self.lineas.aggregate(base=Sum('importe'))['base']
+        base = base or Decimal('0.00')
         
         # Aplicar descuento general si existe
         if self.descuento:
@@ -283,6 +437,34 @@ class Factura(models.Model):
         # Calcular total
         self.total = base + importe_iva + importe_gastos_envio
 
+    def actualizar_totales(self):
+        """
+        Recalcula los totales y guarda solo los campos calculados sin llamar a save() completo
+        """
+        self.calcular_totales()
+        self.actualizar_campos(base_iva=self.base_iva, total=self.total)
+
+    @transaction.atomic
+    def crear_lineas(self, lineas):
+        """
+        Inserta varias líneas en la factura con un número fijo de consultas:
+        un bulk_create, una actualización de stock conjunta y un recálculo de totales
+        """
+        for linea in lineas:
+            linea.factura = self
+            linea.importe = linea.calcular_importe()
+        lineas = LineaFactura.objects.bulk_create(lineas)
+
+        # Igual que al guardar línea a línea, solo los borradores reservan stock
+        if self.estado == 'borrador':
+            cantidades = defaultdict(int)
+            for linea in lineas:
+                cantidades[linea.libro_id] += linea.cantidad
+            Libro.objects.reducir_stock(cantidades, referencia=self.referencia_stock)
+
+        self.actualizar_totales()
+        return lineas
+
     def clean(self):
         """
         Validaciones adicionales del modelo
@@ -293,17 +475,31 @@ class Factura(models.Model):
         if self.estado == 'pagada' and not self.fecha_pago:
             raise ValidationError('Una factura pagada debe tener fecha de pago')
 
+    def verificar_campos_editables(self):
+        """
+        Impide modificar los datos de una factura ya emitida (emitida, pagada o
+        anulada) salvo el estado, el pago, la anulación y las notas
+        """
+        campos = [
+            campo for campo in self.campos_modificados()
+            if campo not in self.campos_editables_emitida and campo != 'updated_on'
+        ]
+        if campos:
+            raise ValidationError({
+                campo: 'No se puede modificar en una factura emitida. Use anulación en su lugar.'
+                for campo in campos
+            })
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
         is_new = not self.pk
         estado_anterior = None
         
         if not is_new:
             # Obtener el estado anterior para detectar cambios
-            try:
-                factura_anterior = Factura.objects.get(pk=self.pk)
-                estado_anterior = factura_anterior.estado
-            except Factura.DoesNotExist:
-                pass
+            estado_anterior = self.valor_anterior('estado')
+            if estado_anterior != 'borrador':
+                self.verificar_campos_editables()
         
         # Si es una nueva factura y es borrador, generar número de borrador
         if is_new and self.estado == 'borrador':
@@ -317,33 +513,43 @@ class Factura(models.Model):
         # Guardar la factura primero
         super().save(*args, **kwargs)
         
-        # Control de stock según el estado
-        if is_new and self.estado == 'borrador':
-            # Nueva factura en borrador: verificar y reducir stock
-            self.verificar_stock_disponible()
-            self.reducir_stock_libros()
-        elif not is_new and estado_anterior == 'borrador' and self.estado == 'emitida':
-            # Cambio de borrador a emitida: el stock ya está reducido, no hacer nada
-            pass
+        # Control de stock según el estado. Una factura nueva aún no tiene
+        # líneas: los borradores reservan el stock al crearlas (crear_lineas)
+        if not is_new and estado_anterior == 'borrador' and self.estado == 'emitida':
+            # Cambio de borrador a emitida: el stock ya está reducido.
+            # Preparar el PDF en segundo plano para que esté listo al descargarlo
+            TrabajoPDF.encolar([self])
         elif not is_new and estado_anterior in ['emitida', 'pagada'] and self.estado == 'anulada':
             # Anulación de factura emitida: recuperar stock
             self.recuperar_stock_libros()
         
         # Calcular totales solo si la factura ya tiene ID (no es nueva)
         if not is_new:
-            self.calcular_totales()
-            # Guardar solo los campos calculados sin llamar a save() completo
-            Factura.objects.filter(pk=self.pk).update(
-                base_iva=self.base_iva,
-                total=self.total
-            )
+            self.actualizar_totales()
+        
+        # Avisar del cambio de estado (informes de ventas, etc.). Una factura
+        # nueva aún no tiene líneas ni totales: avisa quien las crea, después
+        # de crear_lineas (ver FacturaCreateSerializer)
+        if not is_new and estado_anterior != self.estado:
+            self.avisar_cambio_estado(estado_anterior)
         
         # Si es nueva y es borrador, actualizar el número de borrador con el ID real
         if is_new and self.estado == 'borrador':
-            self.numero_borrador = f'BORRADOR-{self.fecha.year}-{self.pk}'
             # Guardar solo el numero_borrador sin llamar a save() completo
-            Factura.objects.filter(pk=self.pk).update(numero_borrador=self.numero_borrador)
+            self.actualizar_campos(numero_borrador=f'BORRADOR-{self.fecha.year}-{self.pk}')
+
+    def avisar_cambio_estado(self, estado_anterior):
+        """
+        Envía estado_facturas_cambiado con el estado y los totales actuales
+        de la factura (estado_anterior es None si la factura es nueva)
+        """
+        estado_facturas_cambiado.send(
+            sender=Factura,
+            facturas=[self],
+            estados_anteriores={self.pk: estado_anterior},
+        )
 
+    @transaction.atomic
     def anular(self, motivo):
         """
         Anula una factura emitida
@@ -354,15 +560,13 @@ class Factura(models.Model):
         if self.estado == 'anulada':
             raise ValidationError("La factura ya está anulada")
         
-        # Recuperar stock si la factura estaba emitida o pagada
-        if self.estado in ['emitida', 'pagada']:
-            self.recuperar_stock_libros()
-        
+        # El stock se recupera en save() al pasar de emitida o pagada a anulada
         self.estado = 'anulada'
         self.motivo_anulacion = motivo
         self.fecha_anulacion = timezone.now()
         self.save()
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
         """
         Previene la eliminación de facturas que no sean borradores
@@ -380,7 +584,61 @@ class Factura(models.Model):
         super().delete(*args, **kwargs)
 
 
-class LineaFactura(models.Model):
+class SecuenciaFactura(models.Model):
+    """
+    Último número de factura asignado en cada ejercicio
+    """
+    ejercicio = models.PositiveIntegerField(
+        unique=True,
+        help_text="Año al que pertenece la numeración"
+    )
+    ultimo_numero = models.PositiveIntegerField(
+        default=0,
+        help_text="Último número de factura asignado en el ejercicio"
+    )
+
+    class Meta:
+        verbose_name = "Secuencia de Factura"
+        verbose_name_plural = "Secuencias de Factura"
+
+    def __str__(self):
+        return f"{self.ejercicio}: {self.ultimo_numero}"
+
+    @classmethod
+    def reservar(cls, ejercicio, cantidad=1):
+        """
+        Reserva `cantidad` números consecutivos del ejercicio y devuelve el primero.
+        El UPDATE bloquea la fila del contador hasta el final de la transacción:
+        las emisiones concurrentes esperan su turno y, si la transacción se revierte,
+        los números vuelven a quedar libres, por lo que la numeración no tiene huecos
+        """
+        with transaction.atomic():
+            contador = cls.objects.filter(ejercicio=ejercicio)
+            if not contador.update(ultimo_numero=F('ultimo_numero') + cantidad):
+                cls._inicializar(ejercicio)
+                contador.update(ultimo_numero=F('ultimo_numero') + cantidad)
+            ultimo_numero = contador.values_list('ultimo_numero', flat=True).get()
+        return ultimo_numero - cantidad + 1
+
+    @classmethod
+    def _inicializar(cls, ejercicio):
+        """
+        Crea el contador del ejercicio partiendo de las facturas ya numeradas
+        """
+        numeros = Factura.objects.filter(
+            numero__startswith=f'F-{ejercicio}-'
+        ).values_list('numero', flat=True)
+        ultimo_numero = max((int(numero.split('-')[-1]) for numero in numeros), default=0)
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(ejercicio=ejercicio, ultimo_numero=ultimo_numero)
+        except IntegrityError:
+            # Otra transacción ha creado el contador a la vez
+            pass
+
+
+class LineaFactura(SeguimientoCamposMixin, models.Model):
     factura = models.ForeignKey(
         Factura, 
         on_delete=models.CASCADE,
@@ -419,6 +677,8 @@ class LineaFactura(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    objects = VersionadoQuerySet.as_manager()
+
     def clean(self):
         """
         Validaciones adicionales del modelo
@@ -448,75 +708,227 @@ class LineaFactura(models.Model):
             
         return importe.quantize(Decimal('0.01'))
 
-    def save(self, *args, **kwargs):
-        is_new = not self.pk
-        cantidad_anterior = 0
+    def bloquear(self):
+        """
+        Bloquea la factura y, si ya existe, la línea hasta el final de la
+        transacción. Devuelve el libro y la cantidad guardados de la línea,
+        leídos ya con el bloqueo: así las ediciones simultáneas de las líneas
+        de una factura se aplican una detrás de otra sobre los datos actuales y
+        no sobre los de una instancia desfasada. Solo se pueden modificar las
+        líneas de los borradores: las de una factura emitida ya cuentan en los
+        resúmenes de ventas
+        """
+        estado = Factura.objects.select_for_update().values_list('estado', flat=True).get(pk=self.factura_id)
+        if estado != 'borrador':
+            raise ValidationError({'factura': 'Solo se pueden modificar las líneas de las facturas en borrador'})
         
-        if not is_new:
-            # Obtener la cantidad anterior para detectar cambios
-            try:
-                linea_anterior = LineaFactura.objects.get(pk=self.pk)
-                cantidad_anterior = linea_anterior.cantidad
-            except LineaFactura.DoesNotExist:
-                pass
+        guardada = None
+        if self.pk:
+            guardada = (
+                LineaFactura.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list('libro_id', 'cantidad')
+                .first()
+            )
+        return guardada or (self.libro_id, 0)
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        # Libro y cantidad guardados para reservar solo la diferencia de stock
+        libro_anterior, cantidad_anterior = self.bloquear()
         
         # Calcular importe
         self.importe = self.calcular_importe()
         
         super().save(*args, **kwargs)
         
-        # Control de stock para cambios en líneas de facturas en borrador
-        if self.factura.estado == 'borrador':
-            if is_new:
-                # Nueva línea: reducir stock
-                if self.libro.cantidad >= self.cantidad:
-                    self.libro.cantidad -= self.cantidad
-                    self.libro.save()
-                else:
-                    raise ValidationError(
-                        f"No hay suficiente stock del libro '{self.libro.titulo}'. "
-                        f"Stock disponible: {self.libro.cantidad}, Cantidad solicitada: {self.cantidad}"
-                    )
-            elif not is_new and cantidad_anterior != self.cantidad:
-                # Línea modificada: ajustar stock
-                diferencia = self.cantidad - cantidad_anterior
-                if diferencia > 0:
-                    # Aumentó la cantidad: reducir más stock
-                    if self.libro.cantidad >= diferencia:
-                        self.libro.cantidad -= diferencia
-                        self.libro.save()
-                    else:
-                        raise ValidationError(
-                            f"No hay suficiente stock del libro '{self.libro.titulo}'. "
-                            f"Stock disponible: {self.libro.cantidad}, Cantidad adicional solicitada: {diferencia}"
-                        )
-                else:
-                    # Disminuyó la cantidad: recuperar stock
-                    self.libro.cantidad += abs(diferencia)
-                    self.libro.save()
+        # Reservar en el stock la diferencia con la línea guardada
+        self.ajustar_stock(libro_anterior, cantidad_anterior)
         
         # Recalcular totales de la factura usando update para evitar recursión
-        self.factura.calcular_totales()
-        Factura.objects.filter(pk=self.factura.pk).update(
-            base_iva=self.factura.base_iva,
-            total=self.factura.total
+        self.factura.actualizar_totales()
+
+    def ajustar_stock(self, libro_anterior, cantidad_anterior):
+        """
+        Registra como movimientos de stock la diferencia entre la línea guardada
+        y la anterior: devuelve lo que tenía reservado y retira lo que tiene ahora
+        """
+        cambios = defaultdict(int)
+        cambios[libro_anterior] -= cantidad_anterior
+        cambios[self.libro_id] += self.cantidad
+        
+        referencia = self.factura.referencia_stock
+        Libro.objects.aumentar_stock(
+            {libro_id: -cantidad for libro_id, cantidad in cambios.items() if cantidad < 0},
+            referencia=referencia,
+        )
+        Libro.objects.reducir_stock(
+            {libro_id: cantidad for libro_id, cantidad in cambios.items() if cantidad > 0},
+            referencia=referencia,
         )
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
         """
         Recupera el stock cuando se elimina una línea de factura en borrador
+        y recalcula los totales de la factura
         """
-        if self.factura.estado == 'borrador':
-            # Recuperar stock antes de eliminar la línea
-            self.libro.cantidad += self.cantidad
-            self.libro.save()
+        libro_anterior, cantidad_anterior = self.bloquear()
+        # Recuperar el stock reservado por la línea tal y como está guardada
+        Libro.objects.aumentar_stock(
+            {libro_anterior: cantidad_anterior},
+            referencia=self.factura.referencia_stock,
+        )
         
         super().delete(*args, **kwargs)
+        self.factura.actualizar_totales()
 
     class Meta:
         verbose_name = "Línea de Factura"
         verbose_name_plural = "Líneas de Factura"
         ordering = ['id']
+        indexes = [
+            # Líneas de un libro (ventas e informes) junto a su factura
+            models.Index(fields=['libro', 'factura'], name='lineafactura_libro_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cantidad}x {self.libro.titulo} - {self.importe}€"
+
+
+class TrabajoPDF(models.Model):
+    """
+    Cola de PDFs de facturas pendientes de renderizar en segundo plano.
+    Los trabajos los consume el comando procesar_pdfs
+    """
+    ESTADOS_TRABAJO = [
+        ("pendiente", "Pendiente"),
+        ("procesando", "Procesando"),
+        ("completado", "Completado"),
+        ("error", "Error"),
+    ]
+    MAX_INTENTOS = 3
+
+    factura = models.ForeignKey(
+        Factura,
+        on_delete=models.CASCADE,
+        related_name='trabajos_pdf',
+        help_text="Factura cuyo PDF se debe renderizar"
+    )
+    mostrar_iban = models.BooleanField(
+        default=False,
+        help_text="Renderizar la variante del PDF que muestra el IBAN"
+    )
+    estado = models.CharField(
+        max_length=10,
+        choices=ESTADOS_TRABAJO,
+        default="pendiente",
+        help_text="Estado del trabajo en la cola"
+    )
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Número de veces que se ha intentado renderizar"
+    )
+    error = models.TextField(
+        blank=True,
+        null=True,
+        help_text="Último error producido al renderizar"
+    )
+    reservado_en = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Fecha y hora en que un proceso reservó el trabajo por última vez"
+    )
+
+    # Campos de auditoría
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Trabajo de PDF"
+        verbose_name_plural = "Trabajos de PDF"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['estado', 'id']),
+        ]
 
     def __str__(self):
-        return f"{self.cantidad}x {self.libro.titulo} - {self.importe}€"
\ No newline at end of file
+        return f"PDF de {self.factura_id} - {self.get_estado_display()}"
+
+    @classmethod
+    def encolar(cls, facturas):
+        """
+        Encola el renderizado de las dos variantes del PDF (con y sin IBAN) de cada factura
+        """
+        return cls.objects.bulk_create(
+            cls(factura=factura, mostrar_iban=mostrar_iban)
+            for factura in facturas
+            for mostrar_iban in (False, True)
+        )
+
+    @classmethod
+    def reservar(cls, cantidad, caducidad=None):
+        """
+        Reserva hasta `cantidad` trabajos pendientes marcándolos como en proceso.
+        Los trabajos bloqueados por otro proceso se saltan. Antes devuelve a la
+        cola los abandonados hace más de `caducidad` segundos (ver recuperar_abandonados)
+        """
+        if caducidad is None:
+            caducidad = settings.FACTURAS_PDF_CADUCIDAD_RESERVA
+        cls.recuperar_abandonados(caducidad)
+
+        ahora = timezone.now()
+        with transaction.atomic():
+            trabajos = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(estado='pendiente')
+                .order_by('id')[:cantidad]
+            )
+            cls.objects.filter(pk__in=[trabajo.pk for trabajo in trabajos]).update(
+                estado='procesando',
+                intentos=F('intentos') + 1,
+                reservado_en=ahora,
+                updated_on=ahora
+            )
+
+        for trabajo in trabajos:
+            trabajo.estado = 'procesando'
+            trabajo.intentos += 1
+            trabajo.reservado_en = ahora
+        return trabajos
+
+    @classmethod
+    def recuperar_abandonados(cls, caducidad):
+        """
+        Los trabajos que siguen en proceso `caducidad` segundos después de
+        reservarlos se dan por abandonados (el proceso que los reservó murió sin
+        terminarlos): vuelven a quedar pendientes o, si han agotado los intentos,
+        se marcan como erróneos. Devuelve cuántos se han recuperado
+        """
+        ahora = timezone.now()
+        abandonados = cls.objects.filter(
+            models.Q(reservado_en__lt=ahora - timedelta(seconds=caducidad))
+            | models.Q(reservado_en__isnull=True),
+            estado='procesando',
+        )
+        error = f"Reserva caducada: el trabajo no terminó en {caducidad} segundos"
+        reintentables = abandonados.filter(intentos__lt=cls.MAX_INTENTOS).update(
+            estado='pendiente', error=error, updated_on=ahora
+        )
+        agotados = abandonados.filter(intentos__gte=cls.MAX_INTENTOS).update(
+            estado='error', error=error, updated_on=ahora
+        )
+        return reintentables + agotados
+
+    def completar(self):
+        self.estado = 'completado'
+        self.error = None
+        self.save(update_fields=['estado', 'error', 'updated_on'])
+
+    def fallar(self, error):
+        """
+        Vuelve a dejar el trabajo pendiente o lo marca como erróneo si ha agotado los intentos
+        """
+        self.estado = 'pendiente' if self.intentos < self.MAX_INTENTOS else 'error'
+        self.error = str(error)
+        self.save(update_fields=['estado', 'error', 'updated_on'])
@@ -0,0 +1,406 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from itertools import islice
+
+import django
+import weasyprint
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django_weasyprint.utils import django_url_fetcher
+
+from backend.streaming import SalidaStreaming
+
+from .models import Empresa, Factura, LineaFactura
+
+TEMPLATE_PDF = 'facturas/factura_pdf.html'
+
+
+class CachePDF:
+    """
+    Almacén en disco de PDFs ya renderizados con expulsión LRU por tamaño.
+    La fecha de modificación de cada fichero se actualiza en cada acierto y
+    al superar el tamaño máximo se eliminan los menos usados recientemente
+    """
+
+    def __init__(self, directorio, max_bytes):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave}.pdf')
+
+    def obtener(self, clave):
+        """
+        Devuelve el contenido guardado para la clave o None si no existe
+        """
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta, 'rb') as fichero:
+                contenido = fichero.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(ruta)
+        except FileNotFoundError:
+            pass
+        return contenido
+
+    def guardar(self, clave, contenido):
+        """
+        Guarda el contenido de forma atómica y libera espacio si es necesario
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        descriptor, ruta_temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as fichero:
+            fichero.write(contenido)
+        os.replace(ruta_temporal, self.ruta(clave))
+        self.purgar()
+
+    def purgar(self):
+        """
+        Elimina los ficheros usados hace más tiempo hasta respetar el tamaño máximo
+        """
+        ficheros = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name.endswith('.pdf'):
+                    estado = entrada.stat()
+                    ficheros.append((estado.st_mtime, estado.st_size, entrada.path))
+
+        ocupado = sum(tamaño for _, tamaño, _ in ficheros)
+        for _, tamaño, ruta in sorted(ficheros):
+            if ocupado <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            ocupado -= tamaño
+
+
+cache_pdf = CachePDF(
+    directorio=settings.FACTURAS_PDF_CACHE_DIR,
+    max_bytes=settings.FACTURAS_PDF_CACHE_MAX_BYTES,
+)
+
+
+def resumen_lineas(lineas):
+    """
+    Resumen de las líneas que forma parte de la versión del PDF: su número, su
+    última modificación y una huella del título y el precio de sus libros, que
+    son los datos del libro que muestra la plantilla. No se usa la fecha de
+    modificación del libro porque cambia con cada movimiento de stock.
+    `lineas` son tuplas (updated_on, titulo, precio) en el orden de la factura
+    """
+    lineas = list(lineas)
+    huella = hashlib.sha256()
+    for _, titulo, precio in lineas:
+        huella.update(f'{titulo}\x1f{precio}\x1e'.encode())
+    return {
+        'num_lineas': len(lineas),
+        'lineas_modificadas': max((modificada for modificada, _, _ in lineas), default=None),
+        'libros': huella.hexdigest(),
+    }
+
+
+def version_pdf(factura, empresa, mostrar_iban, lineas):
+    """
+    Devuelve la clave de caché del PDF de la factura y su fecha de última modificación.
+    La clave cambia cuando se modifica la factura, alguna de sus líneas, el título
+    o el precio de alguno de sus libros o la empresa.
+    `lineas` es el resumen de las líneas calculado con resumen_lineas()
+    """
+    fechas = [factura.updated_on, lineas['lineas_modificadas'], empresa.updated_on if empresa else None]
+    ultima_modificacion = max(fecha for fecha in fechas if fecha)
+
+    partes = [
+        factura.pk,
+        factura.updated_on.isoformat(),
+        lineas['num_lineas'],
+        lineas['lineas_modificadas'].isoformat() if lineas['lineas_modificadas'] else '',
+        lineas['libros'],
+        int(mostrar_iban),
+        f'{empresa.pk}:{empresa.updated_on.isoformat()}' if empresa else '',
+    ]
+    clave = hashlib.sha256('|'.join(map(str, partes)).encode()).hexdigest()
+    return clave, ultima_modificacion
+
+
+def nombre_pdf(factura):
+    """
+    Nombre del fichero PDF de la factura
+    """
+    return f"factura_{factura.numero or factura.numero_borrador or factura.id}.pdf"
+
+
+def renderizar_pdf(contexto):
+    """
+    Renderiza el PDF de la plantilla sin necesidad de una petición HTTP
+    """
+    html = weasyprint.HTML(
+        string=render_to_string(TEMPLATE_PDF, contexto),
+        base_url=getattr(settings, 'WEASYPRINT_BASEURL', None),
+        url_fetcher=django_url_fetcher,
+    )
+    return html.write_pdf()
+
+
+class DocumentoFactura:
+    """
+    Todo lo necesario para servir el PDF de una factura: la factura con sus líneas
+    y libros y la configuración de la empresa. cargar() lo obtiene con dos consultas
+    (la empresa sale de la copia en memoria de Empresa.actual) y el resto de
+    métodos trabajan sobre esos datos sin volver a la base de datos
+    """
+
+    def __init__(self, factura, empresa, mostrar_iban):
+        self.factura = factura
+        self.empresa = empresa
+        self.mostrar_iban = mostrar_iban
+
+    @classmethod
+    def cargar(cls, factura_id, mostrar_iban, queryset=None):
+        """
+        Carga la factura y después sus líneas con los libros. Lanza Http404 si
+        la factura no existe
+        """
+        if queryset is None:
+            queryset = Factura.objects.all()
+
+        factura = get_object_or_404(
+            queryset.prefetch_related(
+                Prefetch('lineas', queryset=LineaFactura.objects.select_related('libro'))
+            ),
+            pk=factura_id,
+        )
+        return cls(factura, Empresa.actual(), mostrar_iban)
+
+    @classmethod
+    def desde_peticion(cls, request, factura_id, queryset=None):
+        """
+        Carga el documento con las opciones indicadas en la URL (?mostrar_iban=true)
+        """
+        mostrar_iban = request.GET.get('mostrar_iban', 'false').lower() == 'true'
+        return cls.cargar(factura_id, mostrar_iban, queryset=queryset)
+
+    @property
+    def lineas(self):
+        return self.factura.lineas.all()
+
+    @property
+    def nombre(self):
+        return nombre_pdf(self.factura)
+
+    def version(self):
+        """
+        Clave de caché y fecha de última modificación del PDF
+        """
+        resumen = resumen_lineas(
+            (linea.updated_on, linea.libro.titulo, linea.libro.precio) for linea in self.lineas
+        )
+        return version_pdf(self.factura, self.empresa, self.mostrar_iban, resumen)
+
+    def contexto(self):
+        """
+        Prepara el contexto de la plantilla del PDF con todos los cálculos hechos
+        """
+        factura = self.factura
+        
+        # Calcular totales
+        subtotal = Decimal('0.00')
+        descuento_total = Decimal('0.00')
+        iva_total = Decimal('0.00')
+        
+        # Calcular subtotal de las líneas y preparar datos de líneas con PVP calculado
+        lineas_con_pvp = []
+        for linea in self.lineas:
+            # Calcular PVP (precio + IVA)
+            pvp_calculado = linea.libro.precio
+            if factura.iva:
+                pvp_calculado = linea.libro.precio * (1 + factura.iva / Decimal('100'))
+            
+            lineas_con_pvp.append({
+                'linea': linea,
+                'pvp_calculado': pvp_calculado
+            })
+            
+            subtotal += linea.importe or Decimal('0.00')
+        
+        # Calcular descuento general si existe
+        if factura.descuento and factura.base_iva:
+            descuento_total = (factura.base_iva * factura.descuento) / Decimal('100')
+        
+        # Calcular IVA si existe
+        if factura.iva and factura.base_iva:
+            iva_total = (factura.base_iva * factura.iva) / Decimal('100')
+        
+        return {
+            'factura': factura,
+            'empresa': self.empresa,
+            'lineas_con_pvp': lineas_con_pvp,
+            'subtotal': subtotal,
+            'descuento_total': descuento_total,
+            'iva_total': iva_total,
+            'gastos_envio': factura.gastos_envio or Decimal('0.00'),
+            'total': factura.total or Decimal('0.00'),
+            'mostrar_iban': self.mostrar_iban,
+        }
+
+    def contenido(self, clave=None):
+        """
+        Devuelve el PDF desde la caché, renderizándolo y guardándolo si aún no lo está
+        """
+        if clave is None:
+            clave, _ = self.version()
+        contenido = cache_pdf.obtener(clave)
+        if contenido is None:
+            contenido = renderizar_pdf(self.contexto())
+            cache_pdf.guardar(clave, contenido)
+        return contenido
+
+    def respuesta(self, request):
+        """
+        Respuesta HTTP de descarga del PDF. Responde 304 si el cliente ya tiene
+        la versión actual
+        """
+        clave, ultima_modificacion = self.version()
+        etag = f'"{clave}"'
+        ultima_modificacion = int(ultima_modificacion.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+        if response is None:
+            response = HttpResponse(self.contenido(clave), content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{self.nombre}"'
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(ultima_modificacion)
+        return response
+
+
+def obtener_pdf(factura_id, mostrar_iban):
+    """
+    Devuelve el PDF de una factura desde la caché o renderizándolo. Se ejecuta
+    en los procesos del pool, fuera del ciclo de petición
+    """
+    return DocumentoFactura.cargar(factura_id, mostrar_iban).contenido()
+
+
+def generar_pdf(factura_id, mostrar_iban):
+    """
+    Deja en la caché el PDF de una factura sin devolver su contenido
+    """
+    obtener_pdf(factura_id, mostrar_iban)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_pdf():
+    """
+    Pool de procesos compartido para renderizar PDFs en paralelo. Los procesos
+    arrancan limpios ('spawn') y abren sus propias conexiones a la base de datos
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.FACTURAS_PDF_PROCESOS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+    return _pool
+
+
+def descartar_pool(pool):
+    """
+    Descarta un pool roto (un proceso ha muerto) para que la siguiente llamada
+    a pool_pdf cree uno nuevo. Si otra petición ya lo ha sustituido no se toca
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def pdfs_facturas(facturas, mostrar_iban, pool, ventana):
+    """
+    Genera (nombre, contenido) de los PDFs de las facturas en orden. Los que no
+    están en la caché se renderizan en el pool y nunca hay más de `ventana`
+    PDFs en memoria a la vez. Las líneas de cada bloque de `ventana` facturas
+    se leen con una consulta para calcular sus versiones
+    """
+    empresa = Empresa.actual()
+    pendientes = deque()
+
+    for bloque in bloques(facturas.iterator(chunk_size=ventana), ventana):
+        lineas = defaultdict(list)
+        datos_lineas = (
+            LineaFactura.objects.filter(factura__in=[factura.pk for factura in bloque])
+            .order_by('factura_id', 'id')
+            .values_list('factura_id', 'updated_on', 'libro__titulo', 'libro__precio')
+        )
+        for factura_id, *datos in datos_lineas:
+            lineas[factura_id].append(datos)
+
+        for factura in bloque:
+            clave, _ = version_pdf(factura, empresa, mostrar_iban, resumen_lineas(lineas[factura.pk]))
+            contenido = cache_pdf.obtener(clave)
+            if contenido is None:
+                futuro = pool.submit(obtener_pdf, factura.pk, mostrar_iban)
+            else:
+                futuro = Future()
+                futuro.set_result(contenido)
+            pendientes.append((nombre_pdf(factura), futuro))
+
+            if len(pendientes) >= ventana:
+                nombre, futuro = pendientes.popleft()
+                yield nombre, futuro.result()
+
+    while pendientes:
+        nombre, futuro = pendientes.popleft()
+        yield nombre, futuro.result()
+
+
+def bloques(elementos, tamaño):
+    """
+    Agrupa un iterable en listas de `tamaño` elementos (la última puede ser menor)
+    """
+    iterador = iter(elementos)
+    while bloque := list(islice(iterador, tamaño)):
+        yield bloque
+
+
+def zip_pdfs(facturas, mostrar_iban, ventana=None):
+    """
+    Genera por partes un ZIP con los PDFs de las facturas, para usar con StreamingHttpResponse
+    """
+    pool = pool_pdf()
+    ventana = ventana or settings.FACTURAS_PDF_PROCESOS * 2
+    salida = SalidaStreaming()
+
+    try:
+        with zipfile.ZipFile(salida, 'w', zipfile.ZIP_STORED) as archivo:
+            for nombre, contenido in pdfs_facturas(facturas, mostrar_iban, pool, ventana):
+                archivo.writestr(nombre, contenido)
+                yield salida.vaciar()
+    except BrokenProcessPool:
+        # Esta descarga ya no se puede completar, pero las siguientes usarán un pool nuevo
+        descartar_pool(pool)
+        raise
+    yield salida.vaciar()
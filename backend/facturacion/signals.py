@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Se envía dentro de la transacción cada vez que una o varias facturas cambian
+# de estado, ya con los totales calculados. Argumentos:
+# - facturas: lista de facturas con el estado nuevo
+# - estados_anteriores: {factura_id: estado anterior} (None si la factura es nueva)
+estado_facturas_cambiado = Signal()
@@ -1,3 +1,259 @@
-from django.test import TestCase
+import random
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.v1.facturacion.serializers import FacturaCreateSerializer
+from inventario.models import Libro
+from reportes.models import FacturasEstado, VentasLibro
+
+from .models import Empresa, Factura, LineaFactura, SecuenciaFactura
+from . import pdf
+from .pdf import DocumentoFactura, pool_pdf, zip_pdfs
+
+
+class CrearFacturaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.libros = Libro.objects.bulk_create(
+            Libro(titulo=f'Libro {numero}', precio=Decimal('10.00'), cantidad=100)
+            for numero in range(50)
+        )
+
+    def crear_factura(self, num_lineas, estado='borrador'):
+        serializer = FacturaCreateSerializer(data={
+            'fecha': date(2025, 3, 1),
+            'cliente': 'Cliente',
+            'estado': estado,
+            'lineas': [
+                {'libro': libro.pk, 'cantidad': 2, 'precio': '10.00'}
+                for libro in self.libros[:num_lineas]
+            ],
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_lineas_y_stock(self):
+        factura = self.crear_factura(5)
+
+        self.assertEqual(factura.lineas.count(), 5)
+        self.assertEqual(factura.base_iva, Decimal('100.00'))
+        self.assertEqual(factura.total, Decimal('121.00'))
+        cantidades = Libro.objects.filter(pk__in=[libro.pk for libro in self.libros[:5]])
+        self.assertEqual(set(cantidades.values_list('cantidad', flat=True)), {98})
+
+    def test_factura_emitida_en_resumenes(self):
+        # Los resúmenes de ventas se actualizan con las líneas y los totales ya creados
+        self.crear_factura(2, estado='emitida')
+
+        resumen = FacturasEstado.objects.get(periodo='dia', estado='emitida')
+        self.assertEqual((resumen.facturas, resumen.total), (1, Decimal('48.40')))
+        self.assertEqual(VentasLibro.objects.filter(periodo='dia').count(), 2)
+
+    def test_consultas_no_dependen_del_numero_de_lineas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.crear_factura(5)
+
+        with self.assertNumQueries(len(consultas)):
+            self.crear_factura(50)
+
+        self.assertEqual(Factura.objects.count(), 2)
+
+
+class DocumentoFacturaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Empresa.objects.create(nombre='Empresa', direccion='Calle', nif='B1', gif='', iban='ES00')
+        libros = Libro.objects.bulk_create(
+            Libro(titulo=f'Libro {numero}', precio=Decimal('10.00'), cantidad=100)
+            for numero in range(10)
+        )
+        cls.factura = Factura.objects.create(fecha=date(2025, 3, 1), cliente='Cliente')
+        cls.factura.crear_lineas([
+            LineaFactura(libro=libro, cantidad=1, precio=Decimal('10.00'))
+            for libro in libros
+        ])
+
+    def setUp(self):
+        Empresa._cache = None
+
+    def preparar(self):
+        documento = DocumentoFactura.cargar(self.factura.pk, mostrar_iban=True)
+        documento.version()
+        contexto = documento.contexto()
+        self.assertEqual(len(contexto['lineas_con_pvp']), 10)
+        self.assertEqual(contexto['empresa'].nombre, 'Empresa')
+
+    def version(self):
+        clave, _ = DocumentoFactura.cargar(self.factura.pk, mostrar_iban=False).version()
+        return clave
+
+    def test_version_no_cambia_con_el_stock(self):
+        version = self.version()
+        libro = self.factura.lineas.first().libro
+        Libro.objects.reducir_stock({libro.pk: 5})
+        self.assertEqual(self.version(), version)
+
+        libro.refresh_from_db()
+        libro.titulo = 'Otro título'
+        libro.save()
+        self.assertNotEqual(self.version(), version)
+
+    def test_consultas_sin_empresa_en_memoria(self):
+        # Factura, líneas con sus libros y empresa
+        with self.assertNumQueries(3):
+            self.preparar()
+
+    def test_consultas_con_empresa_en_memoria(self):
+        Empresa.actual()
+        # Factura y líneas con sus libros
+        with self.assertNumQueries(2):
+            self.preparar()
+
+    def test_vista_pdf_de_factura_inexistente(self):
+        respuesta = self.client.get(reverse('facturacion:factura_pdf', args=[self.factura.pk + 1]))
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class PoolRoto:
+    """
+    Pool cuyo proceso ha muerto: no admite más trabajos
+    """
+    cerrado = False
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool('Un proceso del pool ha terminado de forma inesperada')
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.cerrado = True
+
+
+class PoolPDFTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Empresa.objects.create(nombre='Empresa', direccion='Calle', nif='B1', gif='', iban='ES00')
+        Factura.objects.create(fecha=date(2025, 3, 1), cliente='Cliente')
+
+    def setUp(self):
+        Empresa._cache = None
+        self.pool_original = pdf._pool
+        self.addCleanup(setattr, pdf, '_pool', self.pool_original)
+
+    def test_pool_roto_se_sustituye(self):
+        roto = pdf._pool = PoolRoto()
+
+        with self.assertRaises(BrokenProcessPool):
+            list(zip_pdfs(Factura.objects.all(), mostrar_iban=False))
+
+        self.assertTrue(roto.cerrado)
+        nuevo = pool_pdf()
+        self.addCleanup(nuevo.shutdown)
+        self.assertIsNot(nuevo, roto)
+        self.assertIs(pool_pdf(), nuevo)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class SecuenciaFacturaConcurrenteTests(TransactionTestCase):
+    """
+    Reservas simultáneas de números desde varios hilos, cada uno con su conexión
+    """
+
+    def reservar(self, cantidad):
+        try:
+            return [
+                SecuenciaFactura.reservar(2025, cantidad)
+                for _ in range(10)
+            ]
+        finally:
+            connections.close_all()
+
+    def test_numeros_sin_duplicados_ni_huecos(self):
+        cantidades = [1, 2, 3, 1, 2, 3, 1, 2]
+        with ThreadPoolExecutor(max_workers=len(cantidades)) as executor:
+            primeros = list(executor.map(self.reservar, cantidades))
+
+        numeros = [
+            primero + desplazamiento
+            for cantidad, reservas in zip(cantidades, primeros)
+            for primero in reservas
+            for desplazamiento in range(cantidad)
+        ]
+        total = sum(cantidades) * 10
+        self.assertEqual(sorted(numeros), list(range(1, total + 1)))
+        self.assertEqual(SecuenciaFactura.objects.get(ejercicio=2025).ultimo_numero, total)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class LineasConcurrentesTests(TransactionTestCase):
+    """
+    Varios hilos crean, modifican y eliminan líneas de sus borradores contra los
+    mismos libros. Los rechazos por falta de stock y los errores de bloqueo son
+    esperados; lo que no puede pasar es que se pierda o se duplique stock
+    """
+    stock_inicial = 20
+
+    def editar_lineas(self, factura_id, operaciones=50):
+        aleatorio = random.Random(factura_id)
+        try:
+            factura = Factura.objects.get(pk=factura_id)
+            lineas = []
+            for _ in range(operaciones):
+                try:
+                    operacion = aleatorio.random()
+                    if operacion < 0.5 or not lineas:
+                        libro = aleatorio.choice(self.libros)
+                        linea = LineaFactura(
+                            factura=factura, libro=libro, cantidad=aleatorio.randint(1, 3), precio=libro.precio
+                        )
+                        linea.save()
+                        lineas.append(linea)
+                    elif operacion < 0.8:
+                        linea = aleatorio.choice(lineas)
+                        linea.cantidad = aleatorio.randint(1, 5)
+                        if aleatorio.random() < 0.3:
+                            linea.libro = aleatorio.choice(self.libros)
+                        try:
+                            linea.save()
+                        except (ValidationError, OperationalError):
+                            # La línea sigue como estaba guardada
+                            linea.refresh_from_db()
+                            raise
+                    else:
+                        linea = lineas.pop(aleatorio.randrange(len(lineas)))
+                        linea.delete()
+                except (ValidationError, OperationalError):
+                    pass
+        finally:
+            connections.close_all()
+
+    def test_stock_reservado_sin_perdidas(self):
+        self.libros = [
+            Libro.objects.create(titulo=f'Libro {numero}', precio=Decimal('10.00'), cantidad=self.stock_inicial)
+            for numero in range(3)
+        ]
+        facturas = [
+            Factura.objects.create(fecha=date(2025, 3, 1), cliente=f'Cliente {numero}')
+            for numero in range(6)
+        ]
+
+        with ThreadPoolExecutor(max_workers=len(facturas)) as executor:
+            list(executor.map(self.editar_lineas, [factura.pk for factura in facturas]))
+
+        reservado = dict(
+            LineaFactura.objects.order_by()
+            .values_list('libro')
+            .annotate(total=Sum('cantidad'))
+        )
+        for libro in Libro.objects.con_saldo_movimientos():
+            with self.subTest(libro=libro.titulo):
+                self.assertGreaterEqual(libro.cantidad, 0)
+                self.assertEqual(libro.cantidad + reservado.get(libro.pk, 0), self.stock_inicial)
+                self.assertEqual(libro.cantidad, libro.saldo)
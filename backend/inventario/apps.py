@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InventarioConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inventario"
+
+    def ready(self):
+        from backend.search import crear_busqueda_sqlite
+        post_migrate.connect(crear_busqueda_sqlite, sender=self)
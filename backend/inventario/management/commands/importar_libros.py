@@ -0,0 +1,159 @@
+import os
+import time
+from decimal import Decimal
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from inventario.models import Libro
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa el catálogo de libros desde un Excel o CSV con las columnas "
+        "TITULO, DEP (cantidad) y PRECIO. Crea los títulos nuevos y actualiza "
+        "la cantidad y el precio de los existentes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help="Ruta del archivo .xlsx, .xls o .csv")
+        parser.add_argument(
+            '--hoja',
+            default=0,
+            help="Hoja del Excel a importar (nombre o posición)"
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help="Número de libros por sentencia INSERT/UPDATE"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Mostrar los cambios sin guardarlos"
+        )
+
+    def handle(self, *args, **options):
+        ruta = options['ruta']
+        if not os.path.exists(ruta):
+            raise CommandError(f"El archivo {ruta} no existe.")
+
+        inicio = time.perf_counter()
+        df = self.leer(ruta, options['hoja'])
+        filas = len(df)
+        df = self.limpiar(df)
+
+        existentes = self.existentes(df.index.tolist())
+
+        nuevos = []
+        modificados = []
+        sin_cambios = 0
+        for titulo, cantidad, precio in zip(df.index, df['cantidad'].tolist(), df['precio'].tolist()):
+            libros = existentes.get(titulo)
+            if not libros:
+                nuevos.append(Libro(titulo=titulo, cantidad=cantidad, precio=precio))
+                continue
+            if len(libros) > 1:
+                self.stderr.write(f"Advertencia: hay {len(libros)} libros titulados '{titulo}', se omite")
+                continue
+
+            libro = libros[0]
+            if libro.cantidad == cantidad and libro.precio == precio:
+                sin_cambios += 1
+                continue
+            modificados.append((libro, cantidad, precio))
+
+        if options['dry_run'] or options['verbosity'] >= 2:
+            self.mostrar_cambios(nuevos, modificados)
+
+        if not options['dry_run']:
+            self.guardar(nuevos, modificados, options['lote'])
+
+        duracion = time.perf_counter() - inicio
+        accion = "Simulación completada (no se ha guardado nada)" if options['dry_run'] else "Proceso completado"
+        self.stdout.write(f"\n{accion}:")
+        self.stdout.write(f"- Libros nuevos creados: {len(nuevos)}")
+        self.stdout.write(f"- Libros existentes actualizados: {len(modificados)}")
+        self.stdout.write(f"- Libros sin cambios: {sin_cambios}")
+        self.stdout.write(f"- Filas leídas: {filas} en {duracion:.2f}s ({filas / max(duracion, 1e-9):.0f} filas/s)")
+
+    def existentes(self, titulos):
+        """
+        Libros ya guardados con los títulos del archivo ({titulo: [libros]}).
+        Un SELECT ... WHERE titulo IN (...) por cada bloque de títulos que admite
+        la base de datos: uno solo en PostgreSQL, varios en SQLite, que limita
+        el número de parámetros de una sentencia
+        """
+        existentes = {}
+        bloque = connection.ops.bulk_batch_size(['titulo'], titulos) or 1
+        for inicio in range(0, len(titulos), bloque):
+            libros = Libro.objects.filter(titulo__in=titulos[inicio:inicio + bloque])
+            for libro in libros.only('titulo', 'cantidad', 'precio'):
+                existentes.setdefault(libro.titulo, []).append(libro)
+        return existentes
+
+    def guardar(self, nuevos, modificados, lote):
+        """
+        Crea y actualiza los libros en bloque y registra los cambios de cantidad
+        como movimientos de stock (saldo inicial de los nuevos, ajuste del resto)
+        """
+        for libro, cantidad, precio in modificados:
+            libro.cantidad = cantidad
+            libro.precio = precio
+        Libro.objects.guardar_en_bloque(
+            nuevos,
+            [libro for libro, _, _ in modificados],
+            ['cantidad', 'precio'],
+            lote=lote,
+            referencia='importacion',
+        )
+
+    def leer(self, ruta, hoja):
+        columnas = ['TITULO', 'DEP', 'PRECIO']
+        try:
+            if ruta.lower().endswith('.csv'):
+                df = pd.read_csv(ruta, usecols=columnas, dtype={'TITULO': str})
+            else:
+                hoja = int(hoja) if str(hoja).isdigit() else hoja
+                df = pd.read_excel(ruta, sheet_name=hoja, usecols=columnas, dtype={'TITULO': str})
+        except (ValueError, OSError) as e:
+            raise CommandError(f"Error al leer el archivo: {e}")
+        return df
+
+    def limpiar(self, df):
+        """
+        Normaliza las columnas de forma vectorizada y devuelve un DataFrame
+        indexado por título con las columnas cantidad (int) y precio (Decimal).
+        Si un título se repite se queda la última fila, como hacía update_or_create.
+        """
+        df = df.assign(TITULO=df['TITULO'].str.strip())
+        df = df[df['TITULO'].notna() & (df['TITULO'] != '')]
+
+        cantidad = pd.to_numeric(df['DEP'], errors='coerce')
+        invalidas = df.loc[cantidad.isna() & df['DEP'].notna(), 'TITULO']
+        for titulo in invalidas:
+            self.stderr.write(f"Advertencia: Cantidad no válida para '{titulo}', usando 0")
+
+        precio = pd.to_numeric(df['PRECIO'], errors='coerce').fillna(0).round(2)
+        df = pd.DataFrame({
+            'titulo': df['TITULO'],
+            'cantidad': cantidad.fillna(0).astype(int),
+            'precio': precio.map(lambda valor: Decimal(f'{valor:.2f}')),
+        })
+        return df.drop_duplicates('titulo', keep='last').set_index('titulo')
+
+    def mostrar_cambios(self, nuevos, modificados):
+        """
+        Muestra la diferencia entre el archivo y la base de datos
+        """
+        for libro in nuevos:
+            self.stdout.write(f"+ {libro.titulo} (Cantidad: {libro.cantidad}, Precio: {libro.precio})")
+        for libro, cantidad, precio in modificados:
+            cambios = []
+            if libro.cantidad != cantidad:
+                cambios.append(f"Cantidad: {libro.cantidad} -> {cantidad}")
+            if libro.precio != precio:
+                cambios.append(f"Precio: {libro.precio} -> {precio}")
+            self.stdout.write(f"~ {libro.titulo} ({', '.join(cambios)})")
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.models import Libro
+
+
+class Command(BaseCommand):
+    help = (
+        "Comprueba que la cantidad de cada libro coincide con la suma de sus "
+        "movimientos de stock y corrige los descuadres"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Mostrar los descuadres sin corregirlos"
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if options['dry_run']:
+            descuadres = [
+                (libro, libro.cantidad, libro.saldo)
+                for libro in Libro.objects.descuadrados().order_by('pk')
+            ]
+        else:
+            descuadres = Libro.objects.reconciliar()
+        duracion = time.perf_counter() - inicio
+
+        for libro, cantidad, saldo in descuadres:
+            self.stdout.write(f"~ {libro.titulo} (ID {libro.pk}): cantidad {cantidad} -> saldo {saldo}")
+
+        accion = "descuadrados" if options['dry_run'] else "corregidos"
+        self.stdout.write(f"\nLibros {accion}: {len(descuadres)} ({duracion:.2f}s)")
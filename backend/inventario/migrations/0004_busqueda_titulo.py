@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from backend.search import indices_busqueda
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0003_alter_libro_precio_alter_libro_pvp"),
+    ]
+
+    operations = [
+        indices_busqueda("inventario_libro", ["titulo"]),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def crear_saldos_iniciales(apps, schema_editor):
+    """
+    Registra la cantidad actual de cada libro como su movimiento inicial
+    para que la suma de movimientos coincida con el stock
+    """
+    Libro = apps.get_model("inventario", "Libro")
+    MovimientoStock = apps.get_model("inventario", "MovimientoStock")
+
+    lote = []
+    for libro_id, cantidad in (
+        Libro.objects.exclude(cantidad=0).values_list("id", "cantidad").iterator()
+    ):
+        lote.append(
+            MovimientoStock(libro_id=libro_id, cantidad=cantidad, tipo="inicial")
+        )
+        if len(lote) >= 1000:
+            MovimientoStock.objects.bulk_create(lote)
+            lote = []
+    MovimientoStock.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0004_busqueda_titulo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovimientoStock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cantidad",
+                    models.IntegerField(
+                        help_text="Unidades que entran (positivo) o salen (negativo)"
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("inicial", "Saldo inicial"),
+                            ("venta", "Venta"),
+                            ("devolucion", "Devolución"),
+                            ("ajuste", "Ajuste"),
+                        ],
+                        help_text="Motivo del movimiento",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "referencia",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Origen del movimiento, por ejemplo factura:12",
+                        max_length=100,
+                    ),
+                ),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                (
+                    "libro",
+                    models.ForeignKey(
+                        help_text="Libro cuyo stock cambia",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movimientos",
+                        to="inventario.libro",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Movimiento de stock",
+                "verbose_name_plural": "Movimientos de stock",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["libro", "id"], name="movimientostock_libro_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(crear_saldos_iniciales, migrations.RunPython.noop),
+    ]
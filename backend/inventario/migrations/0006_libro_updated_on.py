@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventario", "0005_movimientostock"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="libro",
+            name="updated_on",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
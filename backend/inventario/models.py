@@ -1,13 +1,258 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from backend.search import buscar
+from backend.seguimiento import SeguimientoCamposMixin
+from backend.versiones import VersionadoQuerySet, tabla_modificada
 
 # Create your models here.
 
-class Libro(models.Model):
+class LibroQuerySet(VersionadoQuerySet):
+    def _cantidad_por_libro(self, cantidades):
+        """
+        Construye una expresión CASE que devuelve la cantidad asociada a cada libro
+        """
+        return Case(
+            *[When(pk=libro_id, then=Value(cantidad)) for libro_id, cantidad in cantidades.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    def errores_stock(self, cantidades):
+        """
+        Devuelve los mensajes de error de los libros que no existen o no tienen
+        stock suficiente para las cantidades solicitadas ({libro_id: cantidad})
+        """
+        libros = list(self.filter(pk__in=cantidades).only('titulo', 'cantidad').order_by('titulo'))
+        existentes = {libro.pk for libro in libros}
+        return [
+            f"El libro {libro_id} no existe"
+            for libro_id in sorted(cantidades)
+            if libro_id not in existentes
+        ] + [
+            f"No hay suficiente stock del libro '{libro.titulo}'. "
+            f"Stock disponible: {libro.cantidad}, Cantidad solicitada: {cantidades[libro.pk]}"
+            for libro in libros
+            if libro.cantidad < cantidades[libro.pk]
+        ]
+
+    def reducir_stock(self, cantidades, tipo='venta', referencia=''):
+        """
+        Reduce el stock de varios libros ({libro_id: cantidad}) con una única
+        sentencia UPDATE condicional y registra los movimientos. Si algún libro
+        no tiene stock suficiente no se modifica ninguno y se informa de todos
+        los títulos afectados.
+        """
+        cantidades = {libro_id: cantidad for libro_id, cantidad in cantidades.items() if cantidad}
+        if not cantidades:
+            return
+
+        cantidad = self._cantidad_por_libro(cantidades)
+        with transaction.atomic():
+            actualizados = self.filter(
+                pk__in=cantidades, cantidad__gte=cantidad
+            ).update(cantidad=F('cantidad') - cantidad, updated_on=timezone.now())
+            if actualizados == len(cantidades):
+                MovimientoStock.registrar(
+                    {libro_id: -cantidad for libro_id, cantidad in cantidades.items()}, tipo, referencia
+                )
+                return
+            transaction.set_rollback(True)
+
+        raise ValidationError(self.errores_stock(cantidades))
+
+    @transaction.atomic
+    def aumentar_stock(self, cantidades, tipo='devolucion', referencia=''):
+        """
+        Aumenta el stock de varios libros ({libro_id: cantidad}) con una única
+        sentencia UPDATE y registra los movimientos
+        """
+        cantidades = {libro_id: cantidad for libro_id, cantidad in cantidades.items() if cantidad}
+        if not cantidades:
+            return
+
+        self.filter(pk__in=cantidades).update(
+            cantidad=F('cantidad') + self._cantidad_por_libro(cantidades),
+            updated_on=timezone.now(),
+        )
+        MovimientoStock.registrar(cantidades, tipo, referencia)
+
+    @transaction.atomic
+    def guardar_en_bloque(self, nuevos, modificados, campos, lote=1000, referencia=''):
+        """
+        Crea los libros `nuevos` y guarda los `campos` de los `modificados` (que
+        ya traen los valores nuevos) por lotes.
+        Los cambios de cantidad se registran como movimientos de stock: saldo
+        inicial de los nuevos y, para los modificados, la diferencia con la
+        cantidad actual, leída con las filas bloqueadas
+        """
+        self.bulk_create(nuevos, batch_size=lote)
+        MovimientoStock.registrar({libro.pk: libro.cantidad for libro in nuevos}, 'inicial', referencia)
+        if not modificados:
+            return
+
+        ajustes = {}
+        if 'cantidad' in campos:
+            for inicio in range(0, len(modificados), lote):
+                bloque = {libro.pk: libro for libro in modificados[inicio:inicio + lote]}
+                actuales = self.select_for_update().filter(pk__in=bloque).values_list('pk', 'cantidad')
+                for libro_id, cantidad in actuales:
+                    ajustes[libro_id] = bloque[libro_id].cantidad - cantidad
+
+        self.actualizar_valores(
+            {libro.pk: [getattr(libro, campo) for campo in campos] for libro in modificados},
+            campos,
+            lote=lote,
+        )
+        MovimientoStock.registrar(ajustes, 'ajuste', referencia)
+
+    @transaction.atomic
+    def fijar_stock(self, cambios, referencia=''):
+        """
+        Aplica un recuento de inventario: {libro_id: (delta, absoluto)}, donde
+        cada libro suma `delta` a su cantidad o, si `absoluto` no es None, pasa
+        a tener esa cantidad. Las cantidades actuales se leen con las filas
+        bloqueadas, las nuevas se escriben con un único UPDATE ... FROM (VALUES ...)
+        y la diferencia se registra como ajuste. Si algún libro no existe o
+        quedaría con stock negativo no se cambia ninguno y se lanza un
+        ValidationError con los errores de cada libro.
+        Devuelve {libro_id: (cantidad anterior, cantidad nueva)}
+        """
+        ids = list(cambios)
+        actuales = {}
+        for inicio in range(0, len(ids), 1000):
+            actuales.update(
+                self.select_for_update().filter(pk__in=ids[inicio:inicio + 1000]).values_list('pk', 'cantidad')
+            )
+
+        errores = {}
+        resultado = {}
+        for libro_id, (delta, absoluto) in cambios.items():
+            if libro_id not in actuales:
+                errores[libro_id] = [f'No existe el libro con id {libro_id}']
+                continue
+            cantidad = absoluto if absoluto is not None else actuales[libro_id] + delta
+            if cantidad < 0:
+                errores[libro_id] = [
+                    f'El stock quedaría negativo: {actuales[libro_id]} {delta:+d} = {cantidad}'
+                ]
+                continue
+            resultado[libro_id] = (actuales[libro_id], cantidad)
+        if errores:
+            raise ValidationError(errores)
+
+        ajustes = {
+            libro_id: nueva - anterior
+            for libro_id, (anterior, nueva) in resultado.items()
+            if nueva != anterior
+        }
+        self.actualizar_valores(
+            {libro_id: [resultado[libro_id][1]] for libro_id in ajustes},
+            ['cantidad'],
+            lote=len(ajustes),
+        )
+        MovimientoStock.registrar(ajustes, 'ajuste', referencia)
+        return resultado
+
+    def actualizar_valores(self, valores, campos, lote=1000):
+        """
+        Asigna a cada libro sus valores ({libro_id: [valor de cada campo]}) con
+        una sentencia UPDATE ... FROM (VALUES ...) por lote. bulk_update genera
+        un CASE con una rama por libro para cada campo, cuyo coste crece con el
+        tamaño del lote; aquí cada fila se une por su clave. Pone updated_on
+        """
+        if not valores:
+            return
+
+        quote = connection.ops.quote_name
+        tabla = quote(Libro._meta.db_table)
+        columnas = [Libro._meta.get_field(campo) for campo in campos]
+        # En (VALUES ...) la columna N se llama columnN, en PostgreSQL y en SQLite
+        asignaciones = ', '.join(
+            [
+                f'{quote(campo.column)} = CAST(v.column{indice} AS {campo.cast_db_type(connection)})'
+                for indice, campo in enumerate(columnas, start=2)
+            ]
+            + [f'{quote("updated_on")} = %s']
+        )
+        filas = [
+            [libro_id, *(campo.get_db_prep_save(valor, connection) for campo, valor in zip(columnas, valores_libro))]
+            for libro_id, valores_libro in valores.items()
+        ]
+        lote = min(lote, connection.ops.bulk_batch_size(['pk', *campos], filas))
+        marcadores = '(' + ', '.join(['%s'] * (len(campos) + 1)) + ')'
+        ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        with connection.cursor() as cursor:
+            for inicio in range(0, len(filas), lote):
+                bloque = filas[inicio:inicio + lote]
+                cursor.execute(
+                    f'UPDATE {tabla} SET {asignaciones} '
+                    f'FROM (VALUES {", ".join([marcadores] * len(bloque))}) AS v '
+                    f'WHERE {tabla}.{quote(Libro._meta.pk.column)} = v.column1',
+                    [ahora, *(valor for fila in bloque for valor in fila)],
+                )
+        tabla_modificada.send(sender=Libro)
+
+    def con_saldo_movimientos(self):
+        """
+        Anota en `saldo` la suma de los movimientos de stock de cada libro
+        con una única consulta agrupada
+        """
+        return self.annotate(saldo=Coalesce(Sum('movimientos__cantidad'), 0))
+
+    def descuadrados(self):
+        """
+        Libros cuya cantidad no coincide con la suma de sus movimientos
+        """
+        return self.con_saldo_movimientos().exclude(cantidad=F('saldo'))
+
+    @transaction.atomic
+    def reconciliar(self):
+        """
+        Recalcula la cantidad de los libros descuadrados a partir de sus
+        movimientos. Bloquea antes las filas de esos libros, así no hay
+        movimientos a medio registrar. Devuelve [(libro, cantidad anterior, saldo)]
+        """
+        descuadrados = list(self.descuadrados().order_by('pk'))
+        if not descuadrados:
+            return []
+
+        ids = [libro.pk for libro in descuadrados]
+        list(Libro.objects.select_for_update().filter(pk__in=ids).values_list('pk'))
+        saldo = (
+            MovimientoStock.objects.filter(libro=OuterRef('pk'))
+            .order_by()
+            .values('libro')
+            .annotate(total=Sum('cantidad'))
+            .values('total')
+        )
+        Libro.objects.filter(pk__in=ids).update(
+            cantidad=Coalesce(Subquery(saldo), 0), updated_on=timezone.now()
+        )
+        return [(libro, libro.cantidad, libro.saldo) for libro in descuadrados]
+
+    def buscar(self, texto):
+        """
+        Busca libros por título ordenados por relevancia
+        """
+        return buscar(self, texto, Libro.campos_busqueda)
+
+
+class Libro(SeguimientoCamposMixin, models.Model):
     titulo = models.CharField(max_length=255)
     pvp = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     descuento = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True, default=0)
     cantidad = models.IntegerField(default=0)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    objects = LibroQuerySet.as_manager()
+
+    # Campos indexados para la búsqueda de texto (ver backend.search)
+    campos_busqueda = ['titulo']
 
     class Meta:
         verbose_name = "Libro"
@@ -15,3 +260,98 @@ class Libro(models.Model):
 
     def __str__(self):
         return self.titulo
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda el libro y registra como movimiento de stock el cambio de cantidad
+        respecto a lo guardado (saldo inicial en los libros nuevos). En los libros
+        cargados de la base de datos solo se escriben los campos modificados, así
+        que la cantidad solo se toca si el llamador la ha cambiado y no se pisan
+        las reservas de stock hechas mientras tanto por las facturas
+        """
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                MovimientoStock.registrar({self.pk: self.cantidad}, 'inicial')
+            return
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not args and hasattr(self, '_valores_cargados'):
+            update_fields = self.campos_modificados()
+        if update_fields is not None and 'cantidad' not in update_fields:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            anterior = (
+                Libro.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list('cantidad', flat=True)
+                .first()
+            )
+            super().save(*args, **kwargs)
+            if anterior is not None:
+                MovimientoStock.registrar({self.pk: self.cantidad - anterior}, 'ajuste')
+
+
+class MovimientoStock(models.Model):
+    """
+    Registro de solo inserción de los cambios de stock de cada libro. La suma de
+    los movimientos de un libro es su cantidad; Libro.cantidad guarda ese saldo
+    para no tener que sumarlo en cada lectura (ver reconciliar_stock)
+    """
+    TIPOS_MOVIMIENTO = [
+        ("inicial", "Saldo inicial"),
+        ("venta", "Venta"),
+        ("devolucion", "Devolución"),
+        ("ajuste", "Ajuste"),
+    ]
+
+    libro = models.ForeignKey(
+        Libro,
+        on_delete=models.CASCADE,
+        related_name='movimientos',
+        help_text="Libro cuyo stock cambia"
+    )
+    cantidad = models.IntegerField(help_text="Unidades que entran (positivo) o salen (negativo)")
+    tipo = models.CharField(
+        max_length=10,
+        choices=TIPOS_MOVIMIENTO,
+        help_text="Motivo del movimiento"
+    )
+    referencia = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text="Origen del movimiento, por ejemplo factura:12"
+    )
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Movimiento de stock"
+        verbose_name_plural = "Movimientos de stock"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['libro', 'id'], name='movimientostock_libro_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.libro_id}: {self.cantidad:+d} ({self.get_tipo_display()})"
+
+    @classmethod
+    def registrar(cls, cantidades, tipo, referencia=''):
+        """
+        Inserta de una vez los movimientos de varios libros ({libro_id: cantidad})
+        """
+        return cls.objects.bulk_create((
+            cls(libro_id=libro_id, cantidad=cantidad, tipo=tipo, referencia=referencia)
+            for libro_id, cantidad in cantidades.items()
+            if cantidad
+        ), batch_size=1000)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError("Los movimientos de stock no se pueden modificar")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Los movimientos de stock no se pueden eliminar")
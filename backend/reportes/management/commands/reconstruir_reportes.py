@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reportes.models import FacturasEstado, VentasCliente, VentasLibro, reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = "Vuelve a calcular desde cero los resúmenes de ventas a partir de las facturas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help="Número de facturas que se agregan en cada bloque"
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        reconstruir_resumenes(lote=options['lote'])
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(f"Resúmenes reconstruidos en {duracion:.2f}s:")
+        self.stdout.write(f"- Ventas por libro: {VentasLibro.objects.count()} filas")
+        self.stdout.write(f"- Ventas por cliente: {VentasCliente.objects.count()} filas")
+        self.stdout.write(f"- Facturas por estado: {FacturasEstado.objects.count()} filas")
@@ -0,0 +1,206 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("inventario", "0004_busqueda_titulo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FacturasEstado",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "periodo",
+                    models.CharField(
+                        choices=[("dia", "Día"), ("mes", "Mes")],
+                        help_text="Granularidad de la fila: día o mes",
+                        max_length=3,
+                    ),
+                ),
+                (
+                    "fecha",
+                    models.DateField(
+                        help_text="Día, o primer día del mes si el periodo es mensual"
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(help_text="Estado de la factura", max_length=10),
+                ),
+                (
+                    "facturas",
+                    models.IntegerField(default=0, help_text="Número de facturas"),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Suma de los totales",
+                        max_digits=14,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Facturas por estado",
+                "verbose_name_plural": "Facturas por estado",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("periodo", "fecha", "estado"),
+                        name="facturasestado_unica",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="VentasCliente",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "periodo",
+                    models.CharField(
+                        choices=[("dia", "Día"), ("mes", "Mes")],
+                        help_text="Granularidad de la fila: día o mes",
+                        max_length=3,
+                    ),
+                ),
+                (
+                    "fecha",
+                    models.DateField(
+                        help_text="Día, o primer día del mes si el periodo es mensual"
+                    ),
+                ),
+                (
+                    "cliente",
+                    models.CharField(help_text="Nombre del cliente", max_length=255),
+                ),
+                (
+                    "facturas",
+                    models.IntegerField(default=0, help_text="Número de facturas"),
+                ),
+                (
+                    "base_iva",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Suma de las bases imponibles",
+                        max_digits=14,
+                    ),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Suma de los totales",
+                        max_digits=14,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ventas por cliente",
+                "verbose_name_plural": "Ventas por cliente",
+                "indexes": [
+                    models.Index(
+                        fields=["cliente", "periodo", "fecha"],
+                        name="ventascliente_cliente_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("periodo", "fecha", "cliente"),
+                        name="ventascliente_unica",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="VentasLibro",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "periodo",
+                    models.CharField(
+                        choices=[("dia", "Día"), ("mes", "Mes")],
+                        help_text="Granularidad de la fila: día o mes",
+                        max_length=3,
+                    ),
+                ),
+                (
+                    "fecha",
+                    models.DateField(
+                        help_text="Día, o primer día del mes si el periodo es mensual"
+                    ),
+                ),
+                (
+                    "unidades",
+                    models.IntegerField(default=0, help_text="Unidades vendidas"),
+                ),
+                (
+                    "importe",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Importe de las líneas vendidas (sin IVA)",
+                        max_digits=14,
+                    ),
+                ),
+                (
+                    "libro",
+                    models.ForeignKey(
+                        help_text="Libro vendido",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumen_ventas",
+                        to="inventario.libro",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ventas por libro",
+                "verbose_name_plural": "Ventas por libro",
+                "indexes": [
+                    models.Index(
+                        fields=["libro", "periodo", "fecha"],
+                        name="ventaslibro_libro_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("periodo", "fecha", "libro"), name="ventaslibro_unica"
+                    )
+                ],
+            },
+        ),
+    ]
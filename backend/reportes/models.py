@@ -1,3 +1,339 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your models here.
+from django.db import connection, models, transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, NullIf
+
+from inventario.models import Libro
+
+# Estados de factura que cuentan como venta
+ESTADOS_VENTA = ('emitida', 'pagada')
+
+PERIODOS = [
+    ("dia", "Día"),
+    ("mes", "Mes"),
+]
+
+
+def fechas_periodo(fecha):
+    """
+    Devuelve (periodo, fecha) de cada resumen en el que se acumula un día
+    """
+    return [('dia', fecha), ('mes', fecha.replace(day=1))]
+
+
+def tramos_ventana(desde, hasta):
+    """
+    Descompone el intervalo [desde, hasta] en los meses completos que contiene
+    y los días sueltos de los extremos. Devuelve (meses, dias): el primer y el
+    último mes completos (o None) y la lista de intervalos de días.
+    Así un año se resuelve con 12 filas mensuales en lugar de 365 diarias.
+    """
+    primer_mes = desde if desde.day == 1 else (desde.replace(day=1) + timedelta(days=32)).replace(day=1)
+    siguiente_mes = (hasta.replace(day=1) + timedelta(days=32)).replace(day=1)
+    if hasta == siguiente_mes - timedelta(days=1):
+        ultimo_mes = hasta.replace(day=1)
+    else:
+        ultimo_mes = (hasta.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+    if primer_mes > ultimo_mes:
+        return None, [(desde, hasta)]
+
+    dias = []
+    if desde < primer_mes:
+        dias.append((desde, primer_mes - timedelta(days=1)))
+    fin_ultimo_mes = (ultimo_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    if fin_ultimo_mes < hasta:
+        dias.append((fin_ultimo_mes + timedelta(days=1), hasta))
+    return (primer_mes, ultimo_mes), dias
+
+
+class ResumenQuerySet(models.QuerySet):
+    def en_ventana(self, desde, hasta):
+        """
+        Filas que cubren exactamente el intervalo [desde, hasta] combinando
+        resúmenes mensuales y diarios (ver tramos_ventana)
+        """
+        meses, dias = tramos_ventana(desde, hasta)
+        condicion = Q()
+        if meses:
+            condicion |= Q(periodo='mes', fecha__range=meses)
+        for intervalo in dias:
+            condicion |= Q(periodo='dia', fecha__range=intervalo)
+        return self.filter(condicion)
+
+
+class VentasLibroQuerySet(ResumenQuerySet):
+    def por_libro(self, desde, hasta):
+        """
+        Unidades e importe vendidos de cada libro en el intervalo, con su título y stock actual
+        """
+        return (
+            self.en_ventana(desde, hasta)
+            .values('libro', 'libro__titulo', 'libro__cantidad')
+            .annotate(unidades=Sum('unidades'), importe=Sum('importe'))
+            .filter(unidades__gt=0)
+        )
+
+    def mas_vendidos(self, desde, hasta, limite=20, orden='unidades'):
+        """
+        Los `limite` libros con más unidades (o importe) vendidos en el intervalo
+        """
+        return self.por_libro(desde, hasta).order_by(f'-{orden}', 'libro')[:limite]
+
+    def rotacion(self, desde, hasta, limite=20):
+        """
+        Libros ordenados por rotación de stock en el intervalo: unidades vendidas
+        entre el stock actual. Los libros agotados (rotación nula) van primero,
+        porque son los más urgentes de reponer. Incluye los días de cobertura
+        que quedan al ritmo de venta del intervalo
+        """
+        dias = (hasta - desde).days + 1
+        stock = Cast(NullIf('libro__cantidad', 0), FloatField())
+        return (
+            self.por_libro(desde, hasta)
+            .annotate(
+                rotacion=ExpressionWrapper(
+                    Cast('unidades', FloatField()) / stock, output_field=FloatField()
+                ),
+                dias_cobertura=ExpressionWrapper(
+                    Cast('libro__cantidad', FloatField()) * dias / Cast('unidades', FloatField()),
+                    output_field=FloatField(),
+                ),
+            )
+            .order_by(F('rotacion').desc(nulls_first=True), 'libro')[:limite]
+        )
+
+
+class Resumen(models.Model):
+    """
+    Tabla de resumen desnormalizada con una fila por periodo, fecha y clave.
+    Las filas se acumulan de forma incremental con `acumular`, que suma los
+    incrementos con un único INSERT ... ON CONFLICT DO UPDATE por lote
+    """
+    periodo = models.CharField(
+        max_length=3,
+        choices=PERIODOS,
+        help_text="Granularidad de la fila: día o mes"
+    )
+    fecha = models.DateField(
+        help_text="Día, o primer día del mes si el periodo es mensual"
+    )
+
+    objects = ResumenQuerySet.as_manager()
+
+    # Campos que identifican la fila (además de periodo y fecha) y campos que se suman
+    campos_clave = []
+    campos_suma = []
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def acumular(cls, incrementos, lote=500):
+        """
+        Suma los incrementos ({(periodo, fecha, *clave): [valores de campos_suma]})
+        a las filas existentes, creando las que falten
+        """
+        filas = [
+            [*clave, *valores]
+            for clave, valores in incrementos.items()
+            if any(valores)
+        ]
+        if not filas:
+            return
+
+        quote = connection.ops.quote_name
+        tabla = quote(cls._meta.db_table)
+        columnas_clave = ['periodo', 'fecha'] + [
+            cls._meta.get_field(campo).column for campo in cls.campos_clave
+        ]
+        columnas_suma = [cls._meta.get_field(campo).column for campo in cls.campos_suma]
+        columnas = ', '.join(quote(columna) for columna in columnas_clave + columnas_suma)
+        conflicto = ', '.join(quote(columna) for columna in columnas_clave)
+        sumas = ', '.join(
+            f'{quote(columna)} = {tabla}.{quote(columna)} + EXCLUDED.{quote(columna)}'
+            for columna in columnas_suma
+        )
+        marcadores = '(' + ', '.join(['%s'] * len(filas[0])) + ')'
+
+        with connection.cursor() as cursor:
+            for inicio in range(0, len(filas), lote):
+                bloque = filas[inicio:inicio + lote]
+                cursor.execute(
+                    f'INSERT INTO {tabla} ({columnas}) VALUES {", ".join([marcadores] * len(bloque))} '
+                    f'ON CONFLICT ({conflicto}) DO UPDATE SET {sumas}',
+                    [valor for fila in bloque for valor in fila],
+                )
+
+
+class VentasLibro(Resumen):
+    """
+    Unidades vendidas e importe de las líneas de cada libro por día y por mes
+    """
+    libro = models.ForeignKey(
+        Libro,
+        on_delete=models.CASCADE,
+        related_name='resumen_ventas',
+        help_text="Libro vendido"
+    )
+    unidades = models.IntegerField(default=0, help_text="Unidades vendidas")
+    importe = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Importe de las líneas vendidas (sin IVA)"
+    )
+
+    objects = VentasLibroQuerySet.as_manager()
+
+    campos_clave = ['libro']
+    campos_suma = ['unidades', 'importe']
+
+    class Meta:
+        verbose_name = "Ventas por libro"
+        verbose_name_plural = "Ventas por libro"
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'fecha', 'libro'], name='ventaslibro_unica'),
+        ]
+        indexes = [
+            # Serie temporal de un libro
+            models.Index(fields=['libro', 'periodo', 'fecha'], name='ventaslibro_libro_idx'),
+        ]
+
+
+class VentasCliente(Resumen):
+    """
+    Facturas, base imponible y total facturado a cada cliente por día y por mes
+    """
+    cliente = models.CharField(max_length=255, help_text="Nombre del cliente")
+    facturas = models.IntegerField(default=0, help_text="Número de facturas")
+    base_iva = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de las bases imponibles"
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de los totales"
+    )
+
+    campos_clave = ['cliente']
+    campos_suma = ['facturas', 'base_iva', 'total']
+
+    class Meta:
+        verbose_name = "Ventas por cliente"
+        verbose_name_plural = "Ventas por cliente"
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'fecha', 'cliente'], name='ventascliente_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['cliente', 'periodo', 'fecha'], name='ventascliente_cliente_idx'),
+        ]
+
+
+class FacturasEstado(Resumen):
+    """
+    Número de facturas y total por estado (sin borradores) por día y por mes
+    """
+    estado = models.CharField(max_length=10, help_text="Estado de la factura")
+    facturas = models.IntegerField(default=0, help_text="Número de facturas")
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Suma de los totales"
+    )
+
+    campos_clave = ['estado']
+    campos_suma = ['facturas', 'total']
+
+    class Meta:
+        verbose_name = "Facturas por estado"
+        verbose_name_plural = "Facturas por estado"
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'fecha', 'estado'], name='facturasestado_unica'),
+        ]
+
+
+def registrar_cambios_estado(facturas, estados_anteriores):
+    """
+    Actualiza los resúmenes con el cambio de estado de las facturas: resta lo
+    que aportaban con el estado anterior y suma lo que aportan con el nuevo.
+    Las líneas de todas las facturas se agregan con una sola consulta
+    """
+    from facturacion.models import LineaFactura
+
+    signos = {}
+    estados = defaultdict(lambda: [0, Decimal('0.00')])
+    clientes = defaultdict(lambda: [0, Decimal('0.00'), Decimal('0.00')])
+    for factura in facturas:
+        anterior = estados_anteriores.get(factura.pk)
+        signo = (factura.estado in ESTADOS_VENTA) - (anterior in ESTADOS_VENTA)
+        total = factura.total or Decimal('0.00')
+
+        for periodo, fecha in fechas_periodo(factura.fecha):
+            if anterior and anterior != 'borrador':
+                fila = estados[(periodo, fecha, anterior)]
+                fila[0] -= 1
+                fila[1] -= total
+            if factura.estado != 'borrador':
+                fila = estados[(periodo, fecha, factura.estado)]
+                fila[0] += 1
+                fila[1] += total
+            if signo:
+                fila = clientes[(periodo, fecha, factura.cliente or '')]
+                fila[0] += signo
+                fila[1] += signo * (factura.base_iva or Decimal('0.00'))
+                fila[2] += signo * total
+
+        if signo:
+            signos[factura.pk] = (signo, factura.fecha)
+
+    libros = defaultdict(lambda: [0, Decimal('0.00')])
+    if signos:
+        lineas = (
+            LineaFactura.objects.filter(factura_id__in=signos)
+            .order_by()
+            .values('factura_id', 'libro_id')
+            .annotate(unidades=Sum('cantidad'), importe=Sum('importe'))
+        )
+        for linea in lineas:
+            signo, fecha = signos[linea['factura_id']]
+            for periodo, fecha_periodo in fechas_periodo(fecha):
+                fila = libros[(periodo, fecha_periodo, linea['libro_id'])]
+                fila[0] += signo * linea['unidades']
+                fila[1] += signo * linea['importe']
+
+    FacturasEstado.acumular(estados)
+    VentasCliente.acumular(clientes)
+    VentasLibro.acumular(libros)
+
+
+@transaction.atomic
+def reconstruir_resumenes(lote=2000):
+    """
+    Vacía los resúmenes y los vuelve a calcular a partir de todas las facturas.
+    Sirve para la carga inicial y para corregir cambios hechos fuera de los
+    modelos (por ejemplo, con UPDATE directos en la base de datos)
+    """
+    from facturacion.models import Factura
+
+    for modelo in (VentasLibro, VentasCliente, FacturasEstado):
+        modelo.objects.all().delete()
+
+    facturas = Factura.objects.exclude(estado='borrador').only(
+        'fecha', 'cliente', 'estado', 'base_iva', 'total'
+    )
+    bloque = []
+    for factura in facturas.iterator(chunk_size=lote):
+        bloque.append(factura)
+        if len(bloque) >= lote:
+            registrar_cambios_estado(bloque, {})
+            bloque = []
+    registrar_cambios_estado(bloque, {})
@@ -0,0 +1,13 @@
+from django.dispatch import receiver
+
+from facturacion.signals import estado_facturas_cambiado
+
+from .models import registrar_cambios_estado
+
+
+@receiver(estado_facturas_cambiado)
+def actualizar_resumenes(sender, facturas, estados_anteriores, **kwargs):
+    """
+    Mantiene los resúmenes de ventas al emitir, pagar o anular facturas
+    """
+    registrar_cambios_estado(facturas, estados_anteriores)
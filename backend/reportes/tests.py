@@ -1,3 +1,64 @@
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Sum
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.v1.facturacion.serializers import FacturaCreateSerializer
+from facturacion.models import Factura
+from inventario.models import Libro
+
+from .models import FacturasEstado, VentasCliente, VentasLibro
+
+
+class ResumenesTests(TestCase):
+    def setUp(self):
+        libro = Libro.objects.create(titulo='Libro', precio=Decimal('10.00'), cantidad=100)
+        serializer = FacturaCreateSerializer(data={
+            'fecha': date(2025, 1, 15),
+            'cliente': 'Cliente',
+            'estado': 'emitida',
+            'lineas': [{'libro': libro.pk, 'cantidad': 3, 'precio': '10.00'}],
+        })
+        serializer.is_valid(raise_exception=True)
+        self.factura = Factura.objects.get(pk=serializer.save().pk)
+
+    def test_editar_y_anular_factura_emitida(self):
+        self.factura.fecha = date(2025, 6, 1)
+        self.factura.cliente = 'Otro cliente'
+        with self.assertRaises(ValidationError):
+            self.factura.save()
+
+        linea = Factura.objects.get(pk=self.factura.pk).lineas.get()
+        linea.cantidad = 5
+        with self.assertRaises(ValidationError):
+            linea.save()
+        with self.assertRaises(ValidationError):
+            linea.delete()
+
+        cliente = APIClient()
+        cliente.credentials(HTTP_X_API_KEY=settings.API_KEY)
+        response = cliente.patch(
+            f'/api/v1/facturacion/facturas/{self.factura.pk}/', {'fecha': '2025-06-01'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        Factura.objects.get(pk=self.factura.pk).anular('Error en los datos')
 
-# Create your tests here.
+        # Lo que sumó la emisión se resta en el mismo mes y cliente
+        self.assertEqual(
+            list(FacturasEstado.objects.filter(periodo='mes').order_by('estado').values_list('fecha', 'estado', 'facturas', 'total')),
+            [
+                (date(2025, 1, 1), 'anulada', 1, Decimal('36.30')),
+                (date(2025, 1, 1), 'emitida', 0, Decimal('0.00')),
+            ],
+        )
+        self.assertEqual(
+            list(VentasCliente.objects.filter(periodo='mes').values_list('fecha', 'cliente', 'facturas', 'total')),
+            [(date(2025, 1, 1), 'Cliente', 0, Decimal('0.00'))],
+        )
+        unidades = VentasLibro.objects.filter(periodo='mes').aggregate(total=Sum('unidades'))['total']
+        self.assertEqual(unidades, 0)
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import django
+from decimal import Decimal
+from datetime import date
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.db import transaction
+from facturacion.models import Factura, LineaFactura
+from inventario.models import Libro
+
+
+class Rollback(Exception):
+    pass
+
+
+def crear_borradores(num_facturas, lineas_por_factura):
+    libro = Libro.objects.create(
+        titulo='Libro benchmark emisión',
+        precio=Decimal('10.00'),
+        cantidad=num_facturas * lineas_por_factura,
+    )
+    facturas = Factura.objects.bulk_create(
+        Factura(fecha=date.today(), cliente='Cliente benchmark', estado='borrador')
+        for _ in range(num_facturas)
+    )
+    LineaFactura.objects.bulk_create(
+        LineaFactura(
+            factura=factura,
+            libro=libro,
+            cantidad=1,
+            precio=libro.precio,
+            importe=libro.precio,
+        )
+        for factura in facturas
+        for _ in range(lineas_por_factura)
+    )
+    return [factura.pk for factura in facturas]
+
+
+def medir(nombre, num_facturas, emitir):
+    """
+    Mide el tiempo de emisión dentro de una transacción que se revierte al final
+    para no dejar datos ni consumir números de factura
+    """
+    try:
+        with transaction.atomic():
+            ids = crear_borradores(num_facturas, lineas_por_factura=5)
+            inicio = time.perf_counter()
+            emitir(ids)
+            duracion = time.perf_counter() - inicio
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"- {nombre}: {duracion:.2f}s ({num_facturas / duracion:.0f} facturas/s)")
+
+
+def emitir_una_a_una(ids):
+    for factura in Factura.objects.filter(pk__in=ids):
+        factura.estado = 'emitida'
+        factura.save()
+
+
+def emitir_en_lote(ids):
+    Factura.objects.filter(pk__in=ids).emitir()
+
+
+if __name__ == "__main__":
+    num_facturas = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print(f"Emisión de {num_facturas} borradores:")
+    medir("Una a una", num_facturas, emitir_una_a_una)
+    medir("En lote", num_facturas, emitir_en_lote)
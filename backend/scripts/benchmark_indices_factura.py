@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import django
+from datetime import date, timedelta
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.db import connection, transaction
+from facturacion.models import Factura, LineaFactura
+
+
+class Rollback(Exception):
+    pass
+
+
+def sembrar(num_facturas, num_libros=1000):
+    """
+    Inserta libros, facturas y una línea por factura con generate_series.
+    Los estados siguen un reparto realista: la mayoría emitidas o pagadas.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM facturacion_factura')
+        ultima_factura = cursor.fetchone()[0]
+
+        cursor.execute(
+            """
+            INSERT INTO inventario_libro (titulo, pvp, precio, descuento, cantidad, updated_on)
+            SELECT 'Libro benchmark ' || g, 20, 15, 0, 1000, now()
+            FROM generate_series(1, %s) AS g
+            RETURNING id
+            """,
+            [num_libros],
+        )
+        libros = [fila[0] for fila in cursor.fetchall()]
+
+        cursor.execute(
+            """
+            INSERT INTO facturacion_factura (
+                numero, fecha, cliente, nombre, estado, fecha_pago, base_iva, iva, total,
+                created_on, updated_on
+            )
+            SELECT
+                CASE WHEN s.estado <> 'borrador'
+                     THEN 'F-' || extract(year FROM s.fecha) || '-B' || lpad(s.g::text, 7, '0') END,
+                s.fecha,
+                'Cliente ' || (s.g %% 5000),
+                'Nombre ' || (s.g %% 5000),
+                s.estado,
+                CASE WHEN s.estado = 'pagada' THEN s.fecha + 30 END,
+                s.total / 1.21, 21, s.total,
+                now(), now()
+            FROM (
+                SELECT
+                    g,
+                    current_date - (random() * 1500)::int AS fecha,
+                    round((random() * 2000)::numeric, 2) AS total,
+                    CASE
+                        WHEN r < 0.05 THEN 'borrador'
+                        WHEN r < 0.55 THEN 'emitida'
+                        WHEN r < 0.95 THEN 'pagada'
+                        ELSE 'anulada'
+                    END AS estado
+                FROM (SELECT g, random() AS r FROM generate_series(1, %s) AS g) AS aleatorio
+            ) AS s
+            """,
+            [num_facturas],
+        )
+
+        cursor.execute(
+            """
+            INSERT INTO facturacion_lineafactura (
+                factura_id, libro_id, cantidad, precio, descuento, importe, created_on, updated_on
+            )
+            SELECT f.id, (%s::bigint[])[1 + (f.id %% %s)], 1, f.total, 0, f.total, now(), now()
+            FROM facturacion_factura f
+            WHERE f.id > %s
+            """,
+            [libros, len(libros), ultima_factura],
+        )
+        cursor.execute('ANALYZE facturacion_factura')
+        cursor.execute('ANALYZE facturacion_lineafactura')
+    return libros
+
+
+def consultas(libro_id):
+    """
+    Consultas de los accesos habituales del listado de facturas (FacturaFilter)
+    """
+    hoy = date.today()
+    orden = ['-fecha', '-id']
+    return {
+        'Listado (-fecha)': Factura.objects.order_by(*orden)[:10],
+        'estado=emitida': Factura.objects.filter(estado='emitida').order_by(*orden)[:10],
+        'estado=borrador': Factura.objects.filter(estado='borrador').order_by(*orden)[:10],
+        'fecha último mes': Factura.objects.filter(
+            fecha__range=(hoy - timedelta(days=30), hoy)
+        ).order_by(*orden)[:10],
+        'fecha_pago último mes': Factura.objects.filter(
+            fecha_pago__gte=hoy - timedelta(days=30)
+        ).order_by(*orden)[:10],
+        'total 1000-1010': Factura.objects.filter(
+            total__gte=1000, total__lte=1010
+        ).order_by(*orden)[:10],
+        'numero F-2024-*': Factura.objects.filter(
+            numero__startswith='F-2024-'
+        ).values('numero').order_by('-numero')[:1],
+        'líneas de un libro': LineaFactura.objects.filter(
+            libro_id=libro_id
+        ).values('factura_id'),
+    }
+
+
+def nodo_acceso(plan):
+    """
+    Tipo del primer nodo del plan que lee la tabla (Seq Scan, Index Scan...)
+    """
+    if 'Scan' in plan['Node Type']:
+        return plan['Node Type']
+    for hijo in plan.get('Plans', []):
+        nodo = nodo_acceso(hijo)
+        if nodo:
+            return nodo
+    return None
+
+
+def medir(libro_id):
+    resultados = {}
+    for nombre, queryset in consultas(libro_id).items():
+        plan = json.loads(queryset.explain(analyze=True, format='json'))[0]
+        resultados[nombre] = (plan['Execution Time'], nodo_acceso(plan['Plan']) or plan['Plan']['Node Type'])
+    return resultados
+
+
+def indices_nuevos():
+    return [(Factura, indice) for indice in Factura._meta.indexes] + [
+        (LineaFactura, indice) for indice in LineaFactura._meta.indexes
+    ]
+
+
+if __name__ == "__main__":
+    if connection.vendor != 'postgresql':
+        print("Este benchmark necesita PostgreSQL (usa EXPLAIN ANALYZE)")
+        sys.exit(1)
+
+    num_facturas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Todo se hace dentro de una transacción que se revierte al final
+    try:
+        with transaction.atomic():
+            print(f"Sembrando {num_facturas} facturas...")
+            libros = sembrar(num_facturas)
+
+            with connection.schema_editor() as editor:
+                for modelo, indice in indices_nuevos():
+                    editor.remove_index(modelo, indice)
+            antes = medir(libros[0])
+
+            with connection.schema_editor() as editor:
+                for modelo, indice in indices_nuevos():
+                    editor.add_index(modelo, indice)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE facturacion_factura')
+                cursor.execute('ANALYZE facturacion_lineafactura')
+            despues = medir(libros[0])
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"\n{'Consulta':<24} {'Sin índices':>34} {'Con índices':>34}")
+    for nombre in antes:
+        (ms_antes, nodo_antes), (ms_despues, nodo_despues) = antes[nombre], despues[nombre]
+        print(
+            f"{nombre:<24} {ms_antes:>10.2f} ms {nodo_antes:>20} "
+            f"{ms_despues:>10.2f} ms {nodo_despues:>20}"
+        )
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+import django
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.test import APIClient
+
+URL = '/api/v1/inventario/libros/bulk/'
+
+
+class Rollback(Exception):
+    pass
+
+
+def filas(num_filas, precio):
+    return [
+        {'titulo': f'Libro benchmark bulk {numero}', 'precio': precio, 'pvp': precio, 'cantidad': numero % 50}
+        for numero in range(num_filas)
+    ]
+
+
+def como_csv(filas):
+    salida = io.StringIO()
+    escritor = csv.DictWriter(salida, fieldnames=list(filas[0]))
+    escritor.writeheader()
+    escritor.writerows(filas)
+    return salida.getvalue()
+
+
+def enviar(cliente, nombre, num_filas, contenido, content_type, modo):
+    inicio = time.perf_counter()
+    response = cliente.generic('POST', f'{URL}?modo={modo}', contenido, content_type=content_type)
+    duracion = time.perf_counter() - inicio
+    resumen = response.json()
+    print(
+        f"- {nombre}: {response.status_code} en {duracion:.2f}s ({num_filas / duracion:.0f} filas/s) "
+        f"creados={resumen.get('creados')} actualizados={resumen.get('actualizados')} "
+        f"errores={len(resumen.get('errores', []))}"
+    )
+
+
+def medir(num_filas):
+    """
+    Crea los libros, vuelve a enviarlos con otros precios (upsert que actualiza)
+    y repite en CSV, dentro de una transacción que se revierte al final
+    """
+    cliente = APIClient()
+    cliente.credentials(HTTP_X_API_KEY=settings.API_KEY)
+    try:
+        with transaction.atomic():
+            enviar(cliente, "JSON crear", num_filas, json.dumps(filas(num_filas, '10.00')), 'application/json', 'crear')
+            enviar(cliente, "JSON upsert (actualiza)", num_filas, json.dumps(filas(num_filas, '12.50')), 'application/json', 'upsert')
+            enviar(cliente, "CSV upsert (actualiza)", num_filas, como_csv(filas(num_filas, '15.00')), 'text/csv', 'upsert')
+            enviar(cliente, "CSV upsert (sin cambios)", num_filas, como_csv(filas(num_filas, '15.00')), 'text/csv', 'upsert')
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    num_filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print(f"Carga en bloque de {num_filas} libros:")
+    medir(num_filas)
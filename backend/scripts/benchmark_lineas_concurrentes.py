@@ -0,0 +1,98 @@
+import os
+import random
+import sys
+import threading
+import time
+import django
+from decimal import Decimal
+from datetime import date
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from facturacion.models import Factura, LineaFactura
+from inventario.models import Libro
+
+
+def trabajador(factura_id, libros, operaciones, resultados):
+    """
+    Crea, modifica y elimina líneas de un borrador contra los mismos libros que
+    el resto de hilos. Los rechazos por falta de stock son esperados; los
+    errores de la base de datos (bloqueos) se cuentan aparte
+    """
+    aleatorio = random.Random(factura_id)
+    factura = Factura.objects.get(pk=factura_id)
+    lineas = []
+    hechas = sin_stock = errores = 0
+    try:
+        for _ in range(operaciones):
+            try:
+                operacion = aleatorio.random()
+                if operacion < 0.5 or not lineas:
+                    libro = aleatorio.choice(libros)
+                    linea = LineaFactura(factura=factura, libro=libro, cantidad=aleatorio.randint(1, 3), precio=libro.precio)
+                    linea.save()
+                    lineas.append(linea)
+                elif operacion < 0.8:
+                    linea = aleatorio.choice(lineas)
+                    linea.cantidad = aleatorio.randint(1, 5)
+                    if aleatorio.random() < 0.3:
+                        linea.libro = aleatorio.choice(libros)
+                    try:
+                        linea.save()
+                    except (ValidationError, OperationalError):
+                        # La línea sigue como estaba guardada
+                        linea.refresh_from_db()
+                        raise
+                else:
+                    linea = lineas.pop(aleatorio.randrange(len(lineas)))
+                    linea.delete()
+                hechas += 1
+            except ValidationError:
+                sin_stock += 1
+            except OperationalError:
+                errores += 1
+    finally:
+        connection.close()
+    resultados.append((hechas, sin_stock, errores))
+
+
+if __name__ == "__main__":
+    num_hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    stock_inicial = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    libros = [
+        Libro.objects.create(titulo=f'Libro benchmark concurrencia {numero}', precio=Decimal('10.00'), cantidad=stock_inicial)
+        for numero in range(3)
+    ]
+    facturas = [
+        Factura.objects.create(fecha=date.today(), cliente=f'Cliente benchmark {numero}', estado='borrador')
+        for numero in range(num_hilos)
+    ]
+    connection.close()
+
+    resultados = []
+    hilos = [
+        threading.Thread(target=trabajador, args=(factura.pk, libros, operaciones, resultados))
+        for factura in facturas
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    hechas, sin_stock, errores = (sum(valores) for valores in zip(*resultados))
+    print(f"{num_hilos} hilos x {operaciones} operaciones sobre {len(libros)} libros con stock {stock_inicial}:")
+    print(f"- Completadas: {hechas}, sin stock: {sin_stock}, errores de la base de datos: {errores}")
+    print(f"- {duracion:.2f}s ({hechas / duracion:.0f} operaciones completadas/s)")
+
+    # Limpiar los datos del benchmark
+    Factura.objects.filter(pk__in=[factura.pk for factura in facturas]).delete()
+    Libro.objects.filter(pk__in=[libro.pk for libro in libros]).delete()